@@ -0,0 +1,346 @@
+import logging
+import pickle
+import queue
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+from django.core.cache import caches
+from django.core.cache.backends import locmem, memcached
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import resp, stats
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+# Сокет, пустой пул соединений или ответ сервера с ошибкой
+ERRORS = (OSError, queue.Empty, resp.RedisError)
+
+
+class StatsMixin:
+    """Count hits and misses of ``get``/``get_many`` per cache alias."""
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.alias = params.get('ALIAS', location)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            stats.record(self.alias, 'misses', key_family=stats.family(key))
+            return default
+        stats.record(self.alias, 'hits', key_family=stats.family(key))
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        stats.record_keys(self.alias, 'hits', found)
+        stats.record_keys(
+            self.alias, 'misses', [key for key in keys if key not in found])
+        return found
+
+
+class LocMemCache(StatsMixin, locmem.LocMemCache):
+    pass
+
+
+class MemcachedCache(StatsMixin, memcached.MemcachedCache):
+    """python-memcached already turns server errors into misses."""
+
+
+class RedisCache(BaseCache):
+    """Shared cache tier speaking the Redis protocol.
+
+    Integers are stored as plain numbers so that ``incr`` maps to
+    ``INCRBY`` (inside a script, so a missing key is not created);
+    everything else is pickled. An unreachable or failing
+    server is logged and counted as an ``errors`` event, reads then miss
+    and writes do nothing, so the site keeps working from the database.
+    """
+    pools = {}
+    pools_lock = threading.Lock()
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.alias = params.get('ALIAS', location)
+        options = params.get('OPTIONS', {})
+        url = urlparse(location)
+        pool_params = {
+            'host': url.hostname or 'localhost',
+            'port': url.port or 6379,
+            'db': int(url.path.lstrip('/') or 0),
+            'password': unquote(url.password) if url.password else None,
+            'max_connections': options.get('MAX_CONNECTIONS', 50),
+            'timeout': options.get('SOCKET_TIMEOUT', 1.0),
+        }
+        # Пул общий для всех экземпляров бэкенда в процессе: Django создаёт
+        # новый экземпляр кэша в каждом потоке
+        with self.pools_lock:
+            pool = self.pools.get(location)
+            if pool is None:
+                pool = self.pools[location] = resp.ConnectionPool(
+                    **pool_params)
+        self.client = resp.Client(pool)
+
+    @staticmethod
+    def dumps(value):
+        if type(value) is int:
+            return b'%d' % value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def loads(data):
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+    def ttl_ms(self, timeout):
+        """Relative expiry in ms, None for "forever", 0 for "expire now"."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+        return max(int(timeout * 1000), 0)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _failed(self, command, error):
+        stats.record(self.alias, 'errors')
+        logger.warning('Cache %s: %s failed: %r', self.alias, command, error)
+
+    def _execute(self, *args, default=None):
+        try:
+            return self.client.execute(*args)
+        except ERRORS as error:
+            self._failed(args[0], error)
+            return default
+
+    def _set(self, key, value, timeout, *flags):
+        ttl = self.ttl_ms(timeout)
+        if ttl == 0:
+            self._execute('DEL', key)
+            return False
+        args = ['SET', key, self.dumps(value)]
+        if ttl is not None:
+            args += ['PX', ttl]
+        return self._execute(*args, *flags) is not None
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._set(self._key(key, version), value, timeout, 'NX')
+
+    def get(self, key, default=None, version=None):
+        data = self._execute('GET', self._key(key, version))
+        if data is None:
+            stats.record(self.alias, 'misses', key_family=stats.family(key))
+            return default
+        stats.record(self.alias, 'hits', key_family=stats.family(key))
+        return self.loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._key(key, version), value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self.ttl_ms(timeout)
+        if ttl is None:
+            return bool(self._execute('PERSIST', key)) or bool(
+                self._execute('EXISTS', key))
+        return bool(self._execute('PEXPIRE', key, ttl))
+
+    def delete(self, key, version=None):
+        self._execute('DEL', self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        redis_keys = [self._key(key, version) for key in keys]
+        values = self._execute('MGET', *redis_keys,
+                               default=[None] * len(redis_keys))
+        found = {
+            key: self.loads(data)
+            for key, data in zip(keys, values) if data is not None
+        }
+        stats.record_keys(self.alias, 'hits', found)
+        stats.record_keys(
+            self.alias, 'misses', [key for key in keys if key not in found])
+        return found
+
+    def has_key(self, key, version=None):
+        return bool(self._execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        try:
+            value = self.client.execute(
+                'EVAL', resp.INCR_EXISTING, 1, key, delta)
+        except resp.RedisError as error:
+            raise ValueError(str(error))
+        except ERRORS as error:
+            self._failed('EVAL', error)
+            raise ValueError(str(error))
+        if value is None:
+            raise ValueError("Key '%s' not found" % key)
+        return value
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._execute('DEL', *keys)
+
+    def clear(self):
+        self._execute('FLUSHDB')
+
+
+class TwoLevelCache(BaseCache):
+    """Small per-process LRU in front of a shared cache alias.
+
+    Local copies live at most ``LOCAL_TIMEOUT`` seconds, so writes made by
+    other processes become visible after that. Keys starting with one of
+    ``BYPASS_PREFIXES`` always go to the shared tier.
+    """
+    stores = {}
+    stores_lock = threading.Lock()
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.alias = params.get('ALIAS', location)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self.bypass_prefixes = tuple(options.get('BYPASS_PREFIXES', ()))
+        # Django создаёт экземпляр кэша на поток, а LRU должен быть общим
+        # для всего процесса
+        with self.stores_lock:
+            store = self.stores.get(self.alias)
+            if store is None:
+                store = self.stores[self.alias] = (OrderedDict(),
+                                                   threading.Lock())
+        self.local, self.lock = store
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_key(self, key, version):
+        if str(key).startswith(self.bypass_prefixes):
+            return None
+        return self.make_key(key, version=version)
+
+    def _remember(self, local_key, value, timeout=None):
+        if local_key is None:
+            return
+        ttl = self.local_timeout
+        if timeout not in (None, DEFAULT_TIMEOUT):
+            ttl = min(ttl, timeout)
+        expires_at = time.monotonic() + ttl
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.local[local_key] = (expires_at, data)
+            self.local.move_to_end(local_key)
+            while len(self.local) > self.local_max_entries:
+                self.local.popitem(last=False)
+
+    def _recall(self, local_key):
+        if local_key is None:
+            return _MISSING
+        with self.lock:
+            item = self.local.get(local_key)
+            if item is None:
+                return _MISSING
+            expires_at, data = item
+            if expires_at <= time.monotonic():
+                del self.local[local_key]
+                return _MISSING
+            self.local.move_to_end(local_key)
+        return pickle.loads(data)
+
+    def _forget(self, local_key):
+        if local_key is not None:
+            with self.lock:
+                self.local.pop(local_key, None)
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        value = self._recall(local_key)
+        if value is not _MISSING:
+            stats.record(self.alias, 'hits', key_family=stats.family(key))
+            stats.record(self.alias, 'local_hits',
+                         key_family=stats.family(key))
+            return value
+        value = self.shared.get(key, _MISSING, version)
+        if value is _MISSING:
+            stats.record(self.alias, 'misses', key_family=stats.family(key))
+            return default
+        stats.record(self.alias, 'hits', key_family=stats.family(key))
+        self._remember(local_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = {}
+        remote = []
+        for key in keys:
+            value = self._recall(self._local_key(key, version))
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        stats.record_keys(self.alias, 'local_hits', found)
+        if remote:
+            fetched = self.shared.get_many(remote, version)
+            for key, value in fetched.items():
+                self._remember(self._local_key(key, version), value)
+            found.update(fetched)
+        stats.record_keys(self.alias, 'hits', found)
+        stats.record_keys(
+            self.alias, 'misses', [key for key in keys if key not in found])
+        return found
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self._remember(self._local_key(key, version), value, timeout)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        if timeout == 0:
+            self._forget(self._local_key(key, version))
+        else:
+            self._remember(self._local_key(key, version), value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self._forget(self._local_key(key, version))
+        self.shared.delete(key, version)
+
+    def has_key(self, key, version=None):
+        if self._recall(self._local_key(key, version)) is not _MISSING:
+            return True
+        return self.shared.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        self._forget(self._local_key(key, version))
+        return self.shared.incr(key, delta, version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._forget(self._local_key(key, version))
+        self.shared.delete_many(keys, version)
+
+    def clear(self):
+        with self.lock:
+            self.local.clear()
+        self.shared.clear()
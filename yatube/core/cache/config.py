@@ -0,0 +1,64 @@
+"""Build ``settings.CACHES`` from a ``CACHE_URL`` environment variable.
+
+Kept free of Django imports so that ``settings.py`` can use it.
+
+* empty -> per-process ``LocMemCache`` (development);
+* ``redis://[:password@]host:port/db`` -> shared Redis tier behind a small
+  per-process LRU;
+* ``memcached://host:port[,host:port]`` -> Django's memcached backend
+  (``python-memcached``) with hit/miss counters behind the same LRU.
+"""
+from urllib.parse import parse_qs, urlparse
+
+LOCAL_TIMEOUT = 5
+LOCAL_MAX_ENTRIES = 1000
+# Счётчики поколений (posts.versions) и списки подписок (posts.follows,
+# CACHE_PREFIX) нельзя держать в локальном LRU: их изменения должны быть
+# сразу видны всем процессам
+BYPASS_PREFIXES = ('version:', 'followed:')
+
+
+def cache_settings(url, key_prefix='yatube'):
+    if not url:
+        return {
+            'default': {
+                'BACKEND': 'core.cache.backends.LocMemCache',
+                'ALIAS': 'default',
+            },
+        }
+    parsed = urlparse(url)
+    query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+    if parsed.scheme == 'redis':
+        shared = {
+            'BACKEND': 'core.cache.backends.RedisCache',
+            'LOCATION': url,
+            'KEY_PREFIX': key_prefix,
+            'OPTIONS': {
+                'MAX_CONNECTIONS': int(query.get('max_connections', 50)),
+                'SOCKET_TIMEOUT': float(query.get('socket_timeout', 1.0)),
+            },
+        }
+    elif parsed.scheme == 'memcached':
+        shared = {
+            'BACKEND': 'core.cache.backends.MemcachedCache',
+            'LOCATION': parsed.netloc.split(','),
+            'KEY_PREFIX': key_prefix,
+        }
+    else:
+        raise ValueError(f'Unsupported CACHE_URL scheme: {parsed.scheme}')
+    shared['ALIAS'] = 'shared'
+    return {
+        'default': {
+            'BACKEND': 'core.cache.backends.TwoLevelCache',
+            'ALIAS': 'default',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_TIMEOUT': int(query.get('local_timeout',
+                                               LOCAL_TIMEOUT)),
+                'LOCAL_MAX_ENTRIES': int(query.get('local_max_entries',
+                                                   LOCAL_MAX_ENTRIES)),
+                'BYPASS_PREFIXES': BYPASS_PREFIXES,
+            },
+        },
+        'shared': shared,
+    }
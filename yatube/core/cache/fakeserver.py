@@ -0,0 +1,196 @@
+"""In-process Redis-compatible server for tests and local development.
+
+Implements the subset of RESP2 commands used by ``RedisCache``; ``EVAL``
+only understands the scripts it sends. Run it standalone with
+``manage.py runcacheserver``.
+"""
+import socketserver
+import threading
+import time
+
+from .resp import INCR_EXISTING
+
+
+class Store:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.databases = {}
+
+    def db(self, index):
+        return self.databases.setdefault(index, {})
+
+    @staticmethod
+    def alive(data, key):
+        item = data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del data[key]
+            return None
+        return item
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.db_index = 0
+
+    def handle(self):
+        while True:
+            try:
+                args = self.read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            try:
+                reply = self.dispatch(args)
+            except CommandError as error:
+                self.wfile.write(b'-ERR %s\r\n' % str(error).encode())
+            else:
+                self.wfile.write(encode(reply))
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if line[:1] != b'*':
+            return line.split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def dispatch(self, args):
+        command = args[0].decode().upper()
+        method = getattr(self, f'cmd_{command.lower()}', None)
+        if method is None:
+            raise CommandError(f"unknown command '{command}'")
+        store = self.server.store
+        with store.lock:
+            return method(store.db(self.db_index), *args[1:])
+
+    def cmd_ping(self, data, *args):
+        return Simple('PONG')
+
+    def cmd_auth(self, data, password):
+        return Simple('OK')
+
+    def cmd_select(self, data, index):
+        self.db_index = int(index)
+        return Simple('OK')
+
+    def cmd_get(self, data, key):
+        item = Store.alive(data, key)
+        return None if item is None else item[0]
+
+    def cmd_mget(self, data, *keys):
+        return [self.cmd_get(data, key) for key in keys]
+
+    def cmd_set(self, data, key, value, *options):
+        options = [option.upper() for option in options]
+        expires_at = None
+        if b'PX' in options:
+            ms = int(options[options.index(b'PX') + 1])
+            expires_at = time.monotonic() + ms / 1000
+        exists = Store.alive(data, key) is not None
+        if b'NX' in options and exists or b'XX' in options and not exists:
+            return None
+        data[key] = (value, expires_at)
+        return Simple('OK')
+
+    def cmd_del(self, data, *keys):
+        removed = 0
+        for key in keys:
+            if Store.alive(data, key) is not None:
+                del data[key]
+                removed += 1
+        return removed
+
+    def cmd_exists(self, data, *keys):
+        return sum(Store.alive(data, key) is not None for key in keys)
+
+    def cmd_incrby(self, data, key, delta):
+        item = Store.alive(data, key)
+        value, expires_at = item if item else (b'0', None)
+        try:
+            value = int(value) + int(delta)
+        except ValueError:
+            raise CommandError('value is not an integer or out of range')
+        data[key] = (b'%d' % value, expires_at)
+        return value
+
+    def cmd_eval(self, data, script, numkeys, *args):
+        if script != INCR_EXISTING.encode():
+            raise CommandError('unsupported script')
+        key, delta = args
+        if Store.alive(data, key) is None:
+            return None
+        return self.cmd_incrby(data, key, delta)
+
+    def cmd_pexpire(self, data, key, ms):
+        item = Store.alive(data, key)
+        if item is None:
+            return 0
+        data[key] = (item[0], time.monotonic() + int(ms) / 1000)
+        return 1
+
+    def cmd_persist(self, data, key):
+        item = Store.alive(data, key)
+        if item is None or item[1] is None:
+            return 0
+        data[key] = (item[0], None)
+        return 1
+
+    def cmd_flushdb(self, data):
+        data.clear()
+        return Simple('OK')
+
+    def cmd_dbsize(self, data):
+        return len(data)
+
+
+class CommandError(Exception):
+    pass
+
+
+class Simple(str):
+    pass
+
+
+def encode(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Simple):
+        return b'+%s\r\n' % reply.encode()
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(map(encode, reply))
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), Handler)
+        self.store = Store()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
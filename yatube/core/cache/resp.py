@@ -0,0 +1,148 @@
+"""Minimal Redis (RESP2) client with a connection pool.
+
+Only the handful of commands the cache backend needs are used, so the
+project does not depend on a third-party Redis driver.
+"""
+import queue
+import socket
+import threading
+
+
+# INCRBY только существующего ключа: вытесненный счётчик не должен
+# появиться заново со значением delta
+INCR_EXISTING = (
+    "if redis.call('EXISTS', KEYS[1]) == 1 then "
+    "return redis.call('INCRBY', KEYS[1], ARGV[1]) end"
+)
+
+
+class RedisError(Exception):
+    pass
+
+
+class Connection:
+    def __init__(self, host, port, db=0, password=None, timeout=1.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    @staticmethod
+    def encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            elif isinstance(arg, int):
+                arg = b'%d' % arg
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by server')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise RedisError(f'Unexpected reply: {line!r}')
+
+    def execute(self, *args):
+        self.sock.sendall(self.encode(args))
+        return self.read_reply()
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class ConnectionPool:
+    """Thread-safe LIFO pool: hot connections are reused first."""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None,
+                 max_connections=50, timeout=1.0):
+        self.params = {'host': host, 'port': port, 'db': db,
+                       'password': password, 'timeout': timeout}
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.max_connections:
+                self.created += 1
+                create = True
+            else:
+                create = False
+        if not create:
+            return self.idle.get(timeout=self.timeout)
+        try:
+            return Connection(**self.params)
+        except OSError:
+            with self.lock:
+                self.created -= 1
+            raise
+
+    def release(self, connection):
+        self.idle.put(connection)
+
+    def discard(self, connection):
+        connection.close()
+        with self.lock:
+            self.created -= 1
+
+    def disconnect(self):
+        while True:
+            try:
+                self.discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class Client:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def execute(self, *args):
+        # Соединение из пула могло быть закрыто сервером: повторяем один раз
+        for attempt in (1, 2):
+            connection = self.pool.acquire()
+            try:
+                reply = connection.execute(*args)
+            except RedisError:
+                self.pool.release(connection)
+                raise
+            except (OSError, ConnectionError):
+                self.pool.discard(connection)
+                if attempt == 2:
+                    raise
+                continue
+            self.pool.release(connection)
+            return reply
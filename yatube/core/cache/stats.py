@@ -0,0 +1,46 @@
+"""Per-process hit/miss counters for every cache alias.
+
+Events are also exported to ``core.metrics`` by key family: the part of
+the key before the first colon, or the fragment name of ``{% cache %}``.
+"""
+import threading
+from collections import Counter, defaultdict
+
+from .. import metrics
+
+FRAGMENT_PREFIX = 'template.cache.'
+
+_lock = threading.Lock()
+_counters = defaultdict(Counter)
+
+
+def family(key):
+    key = str(key)
+    if key.startswith(FRAGMENT_PREFIX):
+        return FRAGMENT_PREFIX + key[len(FRAGMENT_PREFIX):].split('.')[0]
+    prefix, colon, _ = key.partition(':')
+    return prefix if colon else 'other'
+
+
+def record(alias, event, amount=1, key_family='other'):
+    if amount:
+        with _lock:
+            _counters[alias][event] += amount
+        metrics.inc('yatube_cache_requests_total', amount, cache=alias,
+                    family=key_family, result=event)
+
+
+def record_keys(alias, event, keys):
+    for key_family, amount in Counter(map(family, keys)).items():
+        record(alias, event, amount, key_family)
+
+
+def snapshot():
+    """Return ``{alias: {'hits': n, 'misses': n, ...}}``."""
+    with _lock:
+        return {alias: dict(counter) for alias, counter in _counters.items()}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
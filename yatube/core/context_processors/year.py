@@ -1,8 +1,24 @@
+from datetime import datetime, time, timedelta
+
 from django.utils import timezone
 
+_year = None
+_expires_at = None
+
+
+def current_year():
+    """Current year, recomputed once per process per day."""
+    global _year, _expires_at
+    now = timezone.now()
+    if _expires_at is None or now >= _expires_at:
+        today = timezone.localtime(now).date()
+        _year = today.year
+        _expires_at = timezone.make_aware(
+            datetime.combine(today + timedelta(days=1), time.min))
+    return _year
+
 
 def year(request):
-    year_val = timezone.now().year
     return {
-        'year': year_val
+        'year': current_year()
     }
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.storage.fakeserver import FakeS3Server
+
+
+class Command(BaseCommand):
+    help = ('Run the in-process S3-compatible media server for '
+            'development.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=9000)
+        parser.add_argument('--root', help='directory for the objects')
+        parser.add_argument('--bucket', default='media')
+
+    def handle(self, *args, **options):
+        server = FakeS3Server(options['root'], options['host'],
+                              options['port'], options['bucket'])
+        self.stdout.write(f'Serving {server.root} on {server.endpoint}, '
+                          f'set MEDIA_STORAGE_URL={server.url}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,164 @@
+"""Post images and renditions from ``MEDIA_ROOT`` without copying bytes
+through Python.
+
+The view checks that the name is a public media file and hands the
+transfer over according to ``settings.MEDIA_SERVING``:
+
+* ``x-accel-redirect`` -> nginx serves the file from an ``internal``
+  location at ``settings.MEDIA_ACCEL_PREFIX``;
+* ``x-sendfile`` -> Apache (mod_xsendfile) or lighttpd serve the absolute
+  path;
+* ``django`` -> a ``FileResponse``, which gunicorn and other servers with
+  ``wsgi.file_wrapper`` send with ``os.sendfile``. ``Range`` requests get
+  a ``206`` with just the asked bytes.
+
+The front proxy handles ranges and conditional requests itself in the
+first two modes.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified)
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage.backends import CONTENT_ADDRESSED
+
+DJANGO = 'django'
+X_ACCEL_REDIRECT = 'x-accel-redirect'
+X_SENDFILE = 'x-sendfile'
+OFFLOAD_HEADERS = ('X-Accel-Redirect', 'X-Sendfile')
+ACCEL_PREFIX = '/protected-media/'
+PUBLIC_PREFIXES = ('posts/', 'renditions/')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Картинки постов адресуются содержимым и не меняются никогда, превью
+# перерисовываются под тем же именем
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+MAX_AGE = 60 * 60 * 24
+
+
+class RangeFile:
+    """Read at most ``length`` bytes of ``file`` from its position.
+
+    ``fileno`` stays available, so ``wsgi.file_wrapper`` can still use
+    ``sendfile`` limited by ``Content-Length``.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def media_path(name):
+    """Absolute path of a public media file; Http404 for anything else."""
+    parts = name.split('/')
+    if (not name.startswith(PUBLIC_PREFIXES)
+            or any(part.startswith('.') or not part for part in parts)):
+        raise Http404
+    try:
+        path = default_storage.path(name)
+    except (NotImplementedError, SuspiciousFileOperation):
+        # Объектное хранилище отдаёт файлы по своим подписанным ссылкам
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    return path
+
+
+def parse_range(header, size):
+    """``(start, end)`` of a single byte range, None to send everything,
+    or ValueError if the range is outside the file."""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None or match.groups() == ('', ''):
+        # Несколько диапазонов сразу не поддерживаем: RFC 7233 разрешает
+        # ответить целым файлом
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def cache_headers(response, name, stat):
+    max_age = (IMMUTABLE_MAX_AGE if name.startswith(CONTENT_ADDRESSED)
+               else MAX_AGE)
+    response['Cache-Control'] = f'public, max-age={max_age}'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
+
+
+def offload(name, path, stat, mode):
+    response = HttpResponse(content_type=mimetypes.guess_type(name)[0])
+    if mode == X_ACCEL_REDIRECT:
+        prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', ACCEL_PREFIX)
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name)
+    else:
+        response['X-Sendfile'] = path
+    return cache_headers(response, name, stat)
+
+
+def send(request, name, path, stat):
+    modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if modified_since is not None and int(stat.st_mtime) <= modified_since:
+        return cache_headers(HttpResponseNotModified(), name, stat)
+    size = stat.st_size
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if 'HTTP_RANGE' in request.META and (
+            if_range is None or if_range == http_date(stat.st_mtime)):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    file = open(path, 'rb')
+    content_type = (mimetypes.guess_type(name)[0]
+                    or 'application/octet-stream')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(RangeFile(file, end - start + 1),
+                                status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        size = end - start + 1
+    response['Content-Length'] = size
+    response['Accept-Ranges'] = 'bytes'
+    return cache_headers(response, name, stat)
+
+
+@require_safe
+def media_view(request, name):
+    path = media_path(name)
+    stat = os.stat(path)
+    mode = getattr(settings, 'MEDIA_SERVING', DJANGO)
+    if mode in (X_ACCEL_REDIRECT, X_SENDFILE):
+        return offload(name, path, stat, mode)
+    return send(request, name, path, stat)
@@ -0,0 +1,289 @@
+"""Prometheus metrics shared by all worker processes.
+
+Every process adds to its own file of ``float64`` values in
+``settings.METRICS_DIR``, mapped with ``mmap`` so that an increment is a
+dictionary lookup and one ``struct.pack_into``. The ``/metrics`` view reads
+and sums the files of all processes, dead ones included, which keeps
+counters monotonic across worker restarts; clear the directory when the
+service is deployed. Without ``METRICS_DIR`` values stay in the memory of
+the process, which is enough for ``runserver``.
+
+Only counters and histograms are offered: both can be summed over
+processes.
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.views.decorators.cache import never_cache
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+INITIAL_SIZE = 64 * 1024
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+COUNTER = 'counter'
+HISTOGRAM = 'histogram'
+METRICS = {
+    'yatube_http_request_duration_seconds': (
+        HISTOGRAM, 'Time to answer a request, by URL name.'),
+    'yatube_http_responses_total': (
+        COUNTER, 'Responses by URL name and status code.'),
+    'yatube_cache_requests_total': (
+        COUNTER, 'Cache lookups by alias, key family and result.'),
+    'yatube_db_queries_total': (
+        COUNTER, 'SQL queries run while answering requests.'),
+    'yatube_db_query_seconds_total': (
+        COUNTER, 'Time spent in SQL queries while answering requests.'),
+    'yatube_thumbnails_total': (
+        COUNTER, 'Post image renditions queued, rendered or failed.'),
+    'yatube_thumbnail_seconds_total': (
+        COUNTER, 'Time spent rendering post image renditions.'),
+    'yatube_posts_created_total': (COUNTER, 'Posts created.'),
+    'yatube_comments_created_total': (COUNTER, 'Comments created.'),
+    'yatube_follows_created_total': (COUNTER, 'Follows created.'),
+}
+
+HEADER = struct.Struct('<Q')
+LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+
+
+class FileStore:
+    """Append-only ``key -> float64`` table in one mmapped file.
+
+    Entries are ``length, key, padding, value`` aligned to 8 bytes; the
+    header holds the number of bytes in use and is written after the
+    entry, so readers in other processes never see half an entry.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.offsets = {}
+        with open(path, 'a+b') as file:
+            if os.fstat(file.fileno()).st_size < INITIAL_SIZE:
+                file.truncate(INITIAL_SIZE)
+        self.file = open(path, 'r+b')
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.used = HEADER.unpack_from(self.map, 0)[0] or HEADER.size
+        for key, _, offset in entries(self.map, self.used):
+            self.offsets[key] = offset
+
+    def inc(self, key, amount):
+        with self.lock:
+            offset = self.offsets.get(key)
+            if offset is None:
+                offset = self.append(key)
+            value = VALUE.unpack_from(self.map, offset)[0]
+            VALUE.pack_into(self.map, offset, value + amount)
+
+    def append(self, key):
+        encoded = key.encode()
+        padding = -(LENGTH.size + len(encoded)) % 8
+        size = LENGTH.size + len(encoded) + padding + VALUE.size
+        if self.used + size > len(self.map):
+            length = max(len(self.map) * 2, self.used + size)
+            self.map.close()
+            self.file.truncate(length)
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        LENGTH.pack_into(self.map, self.used, len(encoded))
+        self.map[self.used + LENGTH.size:
+                 self.used + LENGTH.size + len(encoded)] = encoded
+        offset = self.used + size - VALUE.size
+        VALUE.pack_into(self.map, offset, 0.0)
+        self.used += size
+        HEADER.pack_into(self.map, 0, self.used)
+        self.offsets[key] = offset
+        return offset
+
+    def collect(self):
+        directory = os.path.dirname(self.path)
+        totals = {}
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            with open(path, 'rb') as file:
+                data = file.read()
+            if len(data) < HEADER.size:
+                continue
+            used = HEADER.unpack_from(data, 0)[0]
+            for key, value, _ in entries(data, used):
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+
+def entries(data, used):
+    position = HEADER.size
+    while position < used:
+        length = LENGTH.unpack_from(data, position)[0]
+        start = position + LENGTH.size
+        key = bytes(data[start:start + length]).decode()
+        offset = start + length + (-(LENGTH.size + length) % 8)
+        yield key, VALUE.unpack_from(data, offset)[0], offset
+        position = offset + VALUE.size
+
+
+class MemoryStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, key, amount):
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def collect(self):
+        with self.lock:
+            return dict(self.values)
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store, _store_pid
+    pid = os.getpid()
+    if _store_pid != pid:
+        # После fork (gunicorn --preload) у процесса должен быть свой файл
+        with _store_lock:
+            if _store_pid != pid:
+                directory = getattr(settings, 'METRICS_DIR', '')
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                    _store = FileStore(os.path.join(directory, f'{pid}.db'))
+                else:
+                    _store = MemoryStore()
+                _store_pid = pid
+    return _store
+
+
+@receiver(setting_changed)
+def metrics_dir_changed(setting, **kwargs):
+    global _store_pid
+    if setting == 'METRICS_DIR':
+        _store_pid = None
+
+
+def series(name, labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+def inc(name, amount=1, **labels):
+    get_store().inc(series(name, labels), amount)
+
+
+def observe(name, value, **labels):
+    """Add ``value`` to a histogram; buckets are cumulated on export."""
+    store = get_store()
+    bucket = next((str(bound) for bound in BUCKETS if value <= bound),
+                   '+Inf')
+    store.inc(series(f'{name}_bucket', {**labels, 'le': bucket}), 1)
+    store.inc(series(f'{name}_sum', labels), value)
+    store.inc(series(f'{name}_count', labels), 1)
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n')
+
+
+def format_series(name, labels, value):
+    if labels:
+        name += '{%s}' % ','.join(
+            f'{label}="{escape(label_value)}"'
+            for label, label_value in labels)
+    return f'{name} {value!r}'
+
+
+def exposition():
+    """All metrics in the Prometheus text format."""
+    samples = {}
+    for key, value in get_store().collect().items():
+        name, labels = json.loads(key)
+        samples.setdefault(name, []).append((tuple(map(tuple, labels)),
+                                             value))
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        if kind == COUNTER:
+            lines += [format_series(name, labels, value)
+                      for labels, value in sorted(samples.get(name, ()))]
+        else:
+            lines += histogram_lines(name, samples)
+    return '\n'.join(lines) + '\n'
+
+
+def histogram_lines(name, samples):
+    buckets = {}
+    for labels, value in samples.get(f'{name}_bucket', ()):
+        bound = dict(labels)['le']
+        labels = tuple(item for item in labels if item[0] != 'le')
+        buckets.setdefault(labels, {})[bound] = value
+    lines = []
+    for labels, count in sorted(samples.get(f'{name}_count', ())):
+        total = 0.0
+        for bound in (*map(str, BUCKETS), '+Inf'):
+            total += buckets.get(labels, {}).get(bound, 0.0)
+            lines.append(format_series(f'{name}_bucket',
+                                       (*labels, ('le', bound)), total))
+        sums = dict(samples.get(f'{name}_sum', ()))
+        lines.append(format_series(f'{name}_sum', labels,
+                                   sums.get(labels, 0.0)))
+        lines.append(format_series(f'{name}_count', labels, count))
+    return lines
+
+
+@never_cache
+def metrics_view(request):
+    return HttpResponse(exposition(), content_type=CONTENT_TYPE)
+
+
+def view_name(request):
+    match = request.resolver_match
+    if match is None:
+        # Ответ из кэша страниц отдаётся до разбора URL
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'unmatched'
+    return match.view_name
+
+
+def count_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        alias = context['connection'].alias
+        inc('yatube_db_queries_total', database=alias)
+        inc('yatube_db_query_seconds_total', time.perf_counter() - start,
+            database=alias)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        name = view_name(request)
+        observe('yatube_http_request_duration_seconds',
+                time.perf_counter() - start, view=name)
+        inc('yatube_http_responses_total', view=name,
+            status=response.status_code)
+        return response
@@ -0,0 +1,109 @@
+"""Read replicas for the read-only feeds with read-your-writes stickiness.
+
+``ReplicaMiddleware`` lets the views in ``READ_VIEWS`` read from a replica
+chosen at random from ``settings.DATABASE_REPLICAS``; everything else,
+including all writes, goes to ``default``. After a non-safe request or
+one that went through ``WRITE_VIEWS`` the response sets a short cookie,
+and while it lives the user reads from ``default`` too, so replication
+lag never hides their own post, comment or follow. Incidental writes of a
+safe request, like a lazily created counters row, do not pin: the cookie
+would also keep anonymous pages out of the page cache.
+
+Replica reads may lag behind generations that were already bumped, so
+they are never stored in the shared caches: ``reading_replica`` turns the
+fragment timeout to zero and the page cache skips requests marked with
+``request.replica``. A page cache miss that may fill the cache is marked
+with ``request.fills_page_cache`` and read from ``default`` instead, so
+anonymous pages are still cached and then served without any database.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+
+READ_VIEWS = {
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:post_comments',
+    'posts:follow_index',
+}
+WRITE_VIEWS = {
+    'posts:post_create',
+    'posts:post_edit',
+    'posts:add_comment',
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+    'posts:follow_bulk',
+}
+# Сессии читаются при каждом запросе и сразу после входа должны быть видны
+PRIMARY_APPS = {'sessions'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+PIN_COOKIE = 'primary_until'
+PIN_SECONDS = 10
+
+_local = threading.local()
+
+
+def pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def reading_replica():
+    """Whether the current request reads from a replica."""
+    return getattr(_local, 'replica', None) is not None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Связанные объекты читаем из той же базы, что и сам объект
+            return instance._state.db
+        replica = getattr(_local, 'replica', None)
+        if replica is None or model._meta.app_label in PRIMARY_APPS:
+            return 'default'
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return True
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS',
+                                   PIN_SECONDS)
+
+    def __call__(self, request):
+        _local.replica = None
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.replica = None
+        match = request.resolver_match
+        if (request.method not in SAFE_METHODS
+                or match is not None and match.view_name in WRITE_VIEWS):
+            response.set_cookie(PIN_COOKIE, str(time.time() +
+                                                self.pin_seconds),
+                                max_age=self.pin_seconds, httponly=True,
+                                samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+        if (replicas and request.resolver_match.view_name in READ_VIEWS
+                and not pinned(request)
+                and not getattr(request, 'fills_page_cache', False)):
+            _local.replica = request.replica = random.choice(replicas)
@@ -0,0 +1,127 @@
+"""Media storages for post images and their renditions.
+
+Uploads under ``CONTENT_ADDRESSED`` prefixes are stored under a SHA-256 of
+their bytes, so the same picture uploaded twice is kept once. Other names
+(renditions, manifests) are deterministic and overwritten in place.
+"""
+import hashlib
+import mimetypes
+import posixpath
+import tempfile
+import time
+from email.utils import parsedate_to_datetime
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage as BaseFileSystem
+from django.core.files.storage import Storage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from . import s3
+from .config import PART_SIZE, URL_EXPIRES
+
+CONTENT_ADDRESSED = ('posts/',)
+SPOOL_SIZE = 4 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+# Подписанная ссылка не меняется в пределах часа, и браузер может её
+# кэшировать
+URL_WINDOW = 60 * 60
+
+
+def content_name(name, content):
+    """``dir/ab/abcdef....ext`` for the SHA-256 of ``content``."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    directory, filename = posixpath.split(name)
+    extension = posixpath.splitext(filename)[1].lower()
+    hexdigest = digest.hexdigest()
+    return posixpath.join(directory, hexdigest[:2], hexdigest + extension)
+
+
+class ContentAddressedMixin:
+    content_addressed = CONTENT_ADDRESSED
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if name.startswith(self.content_addressed):
+            name = content_name(name, content)
+            if self.exists(name):
+                return name
+        return super().save(name, content, max_length=max_length)
+
+
+@deconstructible
+class FileSystemStorage(ContentAddressedMixin, BaseFileSystem):
+    pass
+
+
+@deconstructible
+class S3Storage(ContentAddressedMixin, Storage):
+    """Objects in an S3-compatible bucket, read back by presigned URLs."""
+
+    def __init__(self, options=None):
+        options = options or settings.MEDIA_STORAGE
+        self.client = s3.Client(
+            options['ENDPOINT'], options['BUCKET'], options['ACCESS_KEY'],
+            options['SECRET_KEY'], options.get('REGION', 'us-east-1'))
+        self.url_expires = options.get('URL_EXPIRES', URL_EXPIRES)
+        self.part_size = options.get('PART_SIZE', PART_SIZE)
+        self.public_url = options.get('PUBLIC_URL', '').rstrip('/')
+
+    def _open(self, name, mode='rb'):
+        try:
+            response = self.client.get(name)
+        except s3.S3Error as error:
+            if error.status == 404:
+                raise FileNotFoundError(name) from error
+            raise
+        file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        with response:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                file.write(chunk)
+        file.seek(0)
+        return File(file, name)
+
+    def _save(self, name, content):
+        content.seek(0)
+        content_type = (mimetypes.guess_type(name)[0]
+                        or 'application/octet-stream')
+        self.client.upload(name, content, self.part_size, content_type)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # Ключи либо адресуются содержимым, либо перезаписываются
+        return name
+
+    def delete(self, name):
+        self.client.delete(name)
+
+    def exists(self, name):
+        return self.client.head(name) is not None
+
+    def head(self, name):
+        headers = self.client.head(name)
+        if headers is None:
+            raise FileNotFoundError(name)
+        return headers
+
+    def size(self, name):
+        return int(self.head(name)['Content-Length'])
+
+    def get_modified_time(self, name):
+        modified = parsedate_to_datetime(self.head(name)['Last-Modified'])
+        return modified if settings.USE_TZ else timezone.make_naive(
+            modified)
+
+    def url(self, name):
+        if self.public_url:
+            return f'{self.public_url}/{s3.encode_path(name)}'
+        window = time.time() // URL_WINDOW * URL_WINDOW
+        return self.client.presign(name, self.url_expires + URL_WINDOW,
+                                   now=window)
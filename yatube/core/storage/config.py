@@ -0,0 +1,42 @@
+"""Pick the media storage from a ``MEDIA_STORAGE_URL`` environment variable.
+
+Kept free of Django imports so that ``settings.py`` can use it.
+
+* empty -> files under ``MEDIA_ROOT`` served by the web server;
+* ``s3://access_key:secret_key@host:port/bucket`` -> S3-compatible object
+  storage with presigned download URLs. Query parameters: ``region``,
+  ``secure`` (0 for plain HTTP), ``expires`` (URL lifetime, seconds),
+  ``part_size`` (multipart chunk, bytes) and ``public_url`` (base URL of a
+  public bucket or CDN; URLs are then not signed).
+"""
+from urllib.parse import parse_qs, unquote, urlparse
+
+FILE_SYSTEM = 'core.storage.backends.FileSystemStorage'
+S3 = 'core.storage.backends.S3Storage'
+# Ссылки живут дольше кэша фрагментов (posts.versions.FRAGMENT_TIMEOUT),
+# иначе закэшированная страница отдаст просроченные ссылки
+URL_EXPIRES = 60 * 60 * 24
+PART_SIZE = 8 * 1024 * 1024
+
+
+def storage_settings(url):
+    """Return ``(DEFAULT_FILE_STORAGE, MEDIA_STORAGE)``."""
+    if not url:
+        return FILE_SYSTEM, {}
+    parsed = urlparse(url)
+    if parsed.scheme != 's3':
+        raise ValueError(
+            f'Unsupported MEDIA_STORAGE_URL scheme: {parsed.scheme}')
+    query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+    secure = query.get('secure', '1') not in ('0', 'false')
+    return S3, {
+        'ENDPOINT': f'{"https" if secure else "http"}://{parsed.hostname}'
+                    + (f':{parsed.port}' if parsed.port else ''),
+        'BUCKET': parsed.path.strip('/'),
+        'ACCESS_KEY': unquote(parsed.username or ''),
+        'SECRET_KEY': unquote(parsed.password or ''),
+        'REGION': query.get('region', 'us-east-1'),
+        'URL_EXPIRES': int(query.get('expires', URL_EXPIRES)),
+        'PART_SIZE': int(query.get('part_size', PART_SIZE)),
+        'PUBLIC_URL': query.get('public_url', ''),
+    }
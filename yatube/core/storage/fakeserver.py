@@ -0,0 +1,281 @@
+"""In-process S3-compatible server for tests and local development.
+
+Objects are plain files under a root directory. Implements the subset of
+the S3 API used by ``core.storage.s3.Client``: single and multipart
+uploads, GET, HEAD and DELETE, checking Signature Version 4 headers and
+presigned URLs. Run it standalone with ``manage.py runs3server``.
+"""
+import calendar
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote
+from xml.etree import ElementTree
+
+from . import s3
+
+CHUNK_SIZE = 64 * 1024
+UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+ACCESS_DENIED = b'<Error><Code>AccessDenied</Code></Error>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.handle_request('HEAD')
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_PUT(self):
+        self.handle_request('PUT')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def do_DELETE(self):
+        self.handle_request('DELETE')
+
+    def handle_request(self, method):
+        path, _, query = self.path.partition('?')
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            authorized = self.authorized(method, path, params, body)
+        except (ValueError, KeyError):
+            authorized = False
+        if not authorized:
+            return self.reply(403, ACCESS_DENIED)
+        bucket, _, key = unquote(path).lstrip('/').partition('/')
+        if bucket != self.server.bucket or not key or '..' in key.split('/'):
+            return self.reply(404)
+        handler = getattr(self, f'{method.lower()}_object')
+        handler(key, params, body)
+
+    def authorized(self, method, path, params, body):
+        server = self.server
+        if 'X-Amz-Signature' in params:
+            signature = params.pop('X-Amz-Signature')
+            date = params.get('X-Amz-Date', '')
+            expires = int(params.get('X-Amz-Expires', 0))
+            started = calendar.timegm(
+                time.strptime(date, '%Y%m%dT%H%M%SZ'))
+            if started + expires < time.time():
+                return False
+            credential = params.get('X-Amz-Credential', '')
+            request = s3.canonical_request(
+                method, path, params, {'host': self.headers['Host']},
+                s3.UNSIGNED_PAYLOAD)
+            params['X-Amz-Signature'] = signature
+        else:
+            authorization = self.headers['Authorization']
+            fields = dict(
+                part.strip().split('=', 1)
+                for part in authorization.split(' ', 1)[-1].split(','))
+            signature = fields.get('Signature')
+            credential = fields.get('Credential', '')
+            date = self.headers.get('X-Amz-Date', '')
+            payload_hash = self.headers.get('X-Amz-Content-Sha256', '')
+            if hashlib.sha256(body).hexdigest() != payload_hash:
+                return False
+            signed = fields.get('SignedHeaders', '').split(';')
+            request = s3.canonical_request(
+                method, path, params,
+                {name: self.headers.get(name, '') for name in signed},
+                payload_hash)
+        if credential.split('/', 1)[0] != server.access_key:
+            return False
+        expected = s3.sign(server.secret_key, server.region, date, request)
+        return signature == expected
+
+    def reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def object_headers(self, path):
+        stat = os.stat(path)
+        return {
+            'Content-Length': str(stat.st_size),
+            'Content-Type': (mimetypes.guess_type(path)[0]
+                             or 'application/octet-stream'),
+            'Last-Modified': formatdate(stat.st_mtime, usegmt=True),
+            'ETag': f'"{self.server.etags.get(path, "")}"',
+        }
+
+    def head_object(self, key, params, body):
+        path = self.server.object_path(key)
+        if not os.path.isfile(path):
+            return self.reply(404)
+        headers = self.object_headers(path)
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+    def get_object(self, key, params, body):
+        path = self.server.object_path(key)
+        if not os.path.isfile(path):
+            return self.reply(404, b'<Error><Code>NoSuchKey</Code></Error>')
+        self.send_response(200)
+        for name, value in self.object_headers(path).items():
+            self.send_header(name, value)
+        self.end_headers()
+        with open(path, 'rb') as file:
+            shutil.copyfileobj(file, self.wfile, CHUNK_SIZE)
+
+    def put_object(self, key, params, body):
+        server = self.server
+        if 'uploadId' in params:
+            upload = server.upload_dir(params['uploadId'])
+            if upload is None:
+                return self.reply(404)
+            server.write(os.path.join(upload, str(int(params['partNumber']))),
+                         body)
+            etag = hashlib.md5(body).hexdigest()
+            return self.reply(200, headers={'ETag': f'"{etag}"'})
+        path = server.object_path(key)
+        server.write(path, body)
+        server.etags[path] = hashlib.md5(body).hexdigest()
+        self.reply(200, headers={'ETag': f'"{server.etags[path]}"'})
+
+    def post_object(self, key, params, body):
+        server = self.server
+        if 'uploads' in params:
+            upload_id = uuid.uuid4().hex
+            server.multipart_uploads += 1
+            os.makedirs(os.path.join(server.uploads, upload_id))
+            return self.reply(200, (
+                '<InitiateMultipartUploadResult>'
+                f'<Bucket>{server.bucket}</Bucket><Key>{key}</Key>'
+                f'<UploadId>{upload_id}</UploadId>'
+                '</InitiateMultipartUploadResult>').encode())
+        upload = server.upload_dir(params.get('uploadId', ''))
+        if upload is None:
+            return self.reply(404)
+        numbers = [
+            int(element.text)
+            for element in ElementTree.fromstring(body).iter()
+            if element.tag.rsplit('}', 1)[-1] == 'PartNumber'
+        ]
+        path = server.object_path(key)
+        digests = []
+        with server.atomic_file(path) as target:
+            for number in numbers:
+                with open(os.path.join(upload, str(number)), 'rb') as part:
+                    data = part.read()
+                digests.append(hashlib.md5(data).digest())
+                target.write(data)
+        shutil.rmtree(upload)
+        etag = (f'{hashlib.md5(b"".join(digests)).hexdigest()}'
+                f'-{len(numbers)}')
+        server.etags[path] = etag
+        self.reply(200, (
+            '<CompleteMultipartUploadResult>'
+            f'<Key>{key}</Key><ETag>"{etag}"</ETag>'
+            '</CompleteMultipartUploadResult>').encode())
+
+    def delete_object(self, key, params, body):
+        server = self.server
+        if 'uploadId' in params:
+            upload = server.upload_dir(params['uploadId'])
+            if upload is not None:
+                shutil.rmtree(upload)
+        else:
+            path = server.object_path(key)
+            if os.path.isfile(path):
+                os.remove(path)
+            server.etags.pop(path, None)
+        self.reply(204)
+
+
+class FakeS3Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root=None, host='127.0.0.1', port=0, bucket='media',
+                 access_key='yatube', secret_key='yatube-secret',
+                 region='us-east-1'):
+        super().__init__((host, port), Handler)
+        self.root = root or tempfile.mkdtemp(prefix='fakes3-')
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.uploads = os.path.join(self.root, '.uploads')
+        os.makedirs(self.uploads, exist_ok=True)
+        self.etags = {}
+        self.multipart_uploads = 0
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def url(self):
+        """``MEDIA_STORAGE_URL`` pointing at this server."""
+        host, port = self.server_address[:2]
+        return (f's3://{self.access_key}:{self.secret_key}@{host}:{port}/'
+                f'{self.bucket}?region={self.region}&secure=0')
+
+    def object_path(self, key):
+        return os.path.join(self.root, self.bucket, *key.split('/'))
+
+    def upload_dir(self, upload_id):
+        if not UPLOAD_ID_RE.match(upload_id):
+            return None
+        upload = os.path.join(self.uploads, upload_id)
+        return upload if os.path.isdir(upload) else None
+
+    def write(self, path, data):
+        with self.atomic_file(path) as file:
+            file.write(data)
+
+    def atomic_file(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return AtomicFile(path)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class AtomicFile:
+    """Write to a temporary file and move it over ``path`` on success."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path)
+        fd, self.temporary = tempfile.mkstemp(dir=directory, prefix='.tmp')
+        self.file = os.fdopen(fd, 'wb')
+        return self.file
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.file.close()
+        if exc_type is None:
+            os.replace(self.temporary, self.path)
+        else:
+            os.remove(self.temporary)
@@ -0,0 +1,205 @@
+"""Minimal S3 client: objects, multipart uploads and presigned URLs.
+
+Requests are signed with AWS Signature Version 4 and use path-style
+addressing (``endpoint/bucket/key``), which S3, MinIO and
+``core.storage.fakeserver`` all understand.
+"""
+import hashlib
+import hmac
+import threading
+import time
+from urllib.parse import quote
+from xml.etree import ElementTree
+
+import requests
+
+ALGORITHM = 'AWS4-HMAC-SHA256'
+EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+MAX_PRESIGN_SECONDS = 7 * 24 * 60 * 60
+
+
+class S3Error(Exception):
+    def __init__(self, status, body=b''):
+        super().__init__(f'S3 answered {status}: {body[:200]!r}')
+        self.status = status
+
+
+def amz_date(moment):
+    return time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(moment))
+
+
+def encode_path(path):
+    return quote(path, safe='/~')
+
+
+def canonical_query(params):
+    return '&'.join(
+        f'{quote(str(key), safe="~")}={quote(str(value), safe="~")}'
+        for key, value in sorted(params.items()))
+
+
+def canonical_request(method, path, params, headers, payload_hash):
+    """``headers`` are the signed ones, with lower-case names."""
+    names = sorted(headers)
+    return '\n'.join([
+        method,
+        path,
+        canonical_query(params),
+        ''.join(f'{name}:{str(headers[name]).strip()}\n' for name in names),
+        ';'.join(names),
+        payload_hash,
+    ])
+
+
+def sign(secret_key, region, date, request):
+    """Signature of a canonical request made at ``date`` (amz format)."""
+    scope = f'{date[:8]}/{region}/s3/aws4_request'
+    string_to_sign = '\n'.join([
+        ALGORITHM, date, scope,
+        hashlib.sha256(request.encode()).hexdigest(),
+    ])
+    key = f'AWS4{secret_key}'.encode()
+    for part in (date[:8], region, 's3', 'aws4_request'):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+
+class Client:
+    def __init__(self, endpoint, bucket, access_key, secret_key,
+                 region='us-east-1', timeout=10):
+        self.endpoint = endpoint.rstrip('/')
+        self.host = self.endpoint.split('://', 1)[-1]
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.timeout = timeout
+        self.local = threading.local()
+
+    @property
+    def session(self):
+        # Session держит пул соединений, но между потоками его не делим
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        return session
+
+    def path(self, key):
+        return encode_path(f'/{self.bucket}/{key}')
+
+    def credential(self, date):
+        return (f'{self.access_key}/{date[:8]}/{self.region}/s3/'
+                'aws4_request')
+
+    def request(self, method, key, params=None, body=b'', headers=None,
+                stream=False, expected=(200,)):
+        params = params or {}
+        date = amz_date(time.time())
+        payload_hash = (hashlib.sha256(body).hexdigest() if body
+                        else EMPTY_SHA256)
+        signed = {
+            'host': self.host,
+            'x-amz-content-sha256': payload_hash,
+            'x-amz-date': date,
+            **{name.lower(): value
+               for name, value in (headers or {}).items()},
+        }
+        path = self.path(key)
+        signature = sign(self.secret_key, self.region, date,
+                         canonical_request(method, path, params, signed,
+                                           payload_hash))
+        signed['authorization'] = (
+            f'{ALGORITHM} Credential={self.credential(date)}, '
+            f'SignedHeaders={";".join(sorted(signed))}, '
+            f'Signature={signature}')
+        query = canonical_query(params)
+        url = f'{self.endpoint}{path}' + (f'?{query}' if query else '')
+        response = self.session.request(
+            method, url, data=body, headers=signed, stream=stream,
+            timeout=self.timeout)
+        if response.status_code not in expected:
+            raise S3Error(response.status_code, response.content)
+        return response
+
+    def head(self, key):
+        """Headers of the object, or None if there is no such key."""
+        response = self.request('HEAD', key, expected=(200, 404))
+        if response.status_code == 404:
+            return None
+        return response.headers
+
+    def get(self, key):
+        """Streaming response; iterate ``iter_content`` and close it."""
+        return self.request('GET', key, stream=True)
+
+    def put(self, key, body, content_type='application/octet-stream'):
+        return self.request('PUT', key, body=body,
+                            headers={'Content-Type': content_type})
+
+    def delete(self, key):
+        self.request('DELETE', key, expected=(200, 204, 404))
+
+    def upload(self, key, file, part_size,
+               content_type='application/octet-stream'):
+        """Stream ``file`` to ``key``: one PUT if it fits in a part,
+        a multipart upload otherwise, holding one part in memory."""
+        chunk = file.read(part_size)
+        # Одного байта хватает, чтобы понять, нужна ли вторая часть
+        following = file.read(1)
+        if not following:
+            self.put(key, chunk, content_type)
+            return
+        response = self.request('POST', key, params={'uploads': ''},
+                                headers={'Content-Type': content_type})
+        upload_id = find_text(response.content, 'UploadId')
+        parts = []
+        try:
+            number = 1
+            while chunk:
+                response = self.request(
+                    'PUT', key, body=chunk,
+                    params={'partNumber': number, 'uploadId': upload_id})
+                parts.append((number, response.headers['ETag']))
+                chunk = following + file.read(part_size - len(following))
+                following = b''
+                number += 1
+            self.request('POST', key, params={'uploadId': upload_id},
+                         body=complete_body(parts))
+        except Exception:
+            self.request('DELETE', key, params={'uploadId': upload_id},
+                         expected=(200, 204, 404))
+            raise
+
+    def presign(self, key, expires, now=None):
+        """GET URL valid for ``expires`` seconds from ``now``."""
+        now = time.time() if now is None else now
+        date = amz_date(now)
+        params = {
+            'X-Amz-Algorithm': ALGORITHM,
+            'X-Amz-Credential': self.credential(date),
+            'X-Amz-Date': date,
+            'X-Amz-Expires': min(int(expires), MAX_PRESIGN_SECONDS),
+            'X-Amz-SignedHeaders': 'host',
+        }
+        path = self.path(key)
+        params['X-Amz-Signature'] = sign(
+            self.secret_key, self.region, date,
+            canonical_request('GET', path, params, {'host': self.host},
+                              UNSIGNED_PAYLOAD))
+        return f'{self.endpoint}{path}?{canonical_query(params)}'
+
+
+def find_text(xml, tag):
+    for element in ElementTree.fromstring(xml).iter():
+        if element.tag.rsplit('}', 1)[-1] == tag:
+            return element.text
+    raise S3Error(200, xml)
+
+
+def complete_body(parts):
+    items = ''.join(
+        f'<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>'
+        for number, etag in parts)
+    return (f'<CompleteMultipartUpload>{items}'
+            '</CompleteMultipartUpload>').encode()
@@ -0,0 +1,151 @@
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ..cache import stats
+from ..cache.config import cache_settings
+from ..cache.fakeserver import FakeRedisServer
+
+
+class FakeServerMixin:
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeRedisServer().start()
+        cls.settings_override = override_settings(
+            CACHES=cache_settings(cls.server.url))
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+        cls.server.stop()
+
+    def setUp(self):
+        caches['default'].clear()
+        stats.reset()
+
+
+class RedisCacheTests(FakeServerMixin, SimpleTestCase):
+    def test_basic_operations(self):
+        """Общий кэш поддерживает операции API кэша Django."""
+        cache = caches['shared']
+        cache.set('post', {'text': 'Текст'})
+        self.assertEqual(cache.get('post'), {'text': 'Текст'})
+        self.assertFalse(cache.add('post', 'other'))
+        self.assertTrue(cache.add('new', 1))
+        self.assertEqual(cache.incr('new', 5), 6)
+        self.assertEqual(cache.get('new'), 6)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        self.assertEqual(cache.get_many(['post', 'new', 'missing']),
+                         {'post': {'text': 'Текст'}, 'new': 6})
+        cache.delete('post')
+        self.assertIsNone(cache.get('post'))
+
+    def test_incr_is_atomic(self):
+        """incr - одна команда и не создаёт вытесненный ключ заново."""
+        cache = caches['shared']
+        cache.set('generation', 41)
+        with mock.patch.object(cache.client, 'execute',
+                               wraps=cache.client.execute) as execute:
+            self.assertEqual(cache.incr('generation'), 42)
+        execute.assert_called_once()
+        cache.delete('generation')
+        with self.assertRaises(ValueError):
+            cache.incr('generation')
+        self.assertIsNone(cache.get('generation'))
+        cache.set('text', 'не число')
+        with self.assertRaises(ValueError):
+            cache.incr('text')
+
+    def test_expiry(self):
+        """Значения с таймаутом истекают."""
+        cache = caches['shared']
+        cache.set('short', 'value', 0.05)
+        cache.set('zero', 'value', 0)
+        self.assertEqual(cache.get('short'), 'value')
+        self.assertIsNone(cache.get('zero'))
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('short'))
+
+    def test_two_level_counts_local_hits(self):
+        """Повторное чтение отдаётся из локального LRU."""
+        cache = caches['default']
+        cache.set('key', 'value')
+        caches['shared'].set('key', 'changed')
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertIsNone(cache.get('absent'))
+        counters = stats.snapshot()['default']
+        self.assertEqual(counters['local_hits'], 1)
+        self.assertEqual(counters['hits'], 1)
+        self.assertEqual(counters['misses'], 1)
+
+    def test_versions_bypass_local_tier(self):
+        """Счётчики поколений всегда читаются из общего кэша."""
+        cache = caches['default']
+        cache.set('version:all', 1)
+        caches['shared'].incr('version:all')
+        self.assertEqual(cache.get('version:all'), 2)
+
+    def test_followed_bypass_local_tier(self):
+        """Сброс списка подписок в другом процессе виден сразу."""
+        cache = caches['default']
+        cache.set('followed:1', [2, 3])
+        caches['shared'].delete('followed:1')
+        self.assertIsNone(cache.get('followed:1'))
+
+
+class SharedCachePagesTests(FakeServerMixin, TestCase):
+    def test_pages_use_shared_cache(self):
+        """Страницы работают поверх общего кэша и попадают в него."""
+        client = Client()
+        client.get(reverse('posts:index'))
+        client.get(reverse('posts:index'))
+        self.assertGreater(stats.snapshot()['default']['hits'], 0)
+        self.assertGreater(caches['shared'].client.execute('DBSIZE'), 0)
+
+
+class SharedCacheDownTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        server = FakeRedisServer()
+        server.server_close()
+        cls.settings_override = override_settings(
+            CACHES=cache_settings(server.url))
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.settings_override.disable()
+
+    def setUp(self):
+        stats.reset()
+
+    def test_errors_are_misses(self):
+        """Недоступный Redis - это промах, запись ничего не делает."""
+        cache = caches['shared']
+        with self.assertLogs('core.cache.backends', 'WARNING'):
+            cache.set('key', 'value')
+            self.assertIsNone(cache.get('key'))
+            self.assertFalse(cache.add('key', 'value'))
+            self.assertEqual(cache.get_many(['key', 'other']), {})
+            with self.assertRaises(ValueError):
+                cache.incr('key')
+            cache.delete('key')
+        counters = stats.snapshot()['shared']
+        self.assertEqual(counters['misses'], 3)
+        self.assertEqual(counters['errors'], 6)
+
+    def test_pages_work_without_cache(self):
+        """Сайт отвечает из базы, пока общий кэш недоступен."""
+        with self.assertLogs('core.cache.backends', 'WARNING'):
+            response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(stats.snapshot()['shared']['errors'], 0)
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import Client, TestCase, override_settings
+from django.utils.http import http_date
+
+from ..media import parse_range
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+DATA = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.name = default_storage.save('posts/pic.jpg', ContentFile(DATA))
+        default_storage.save('renditions/ab/manifest.json',
+                             ContentFile(b'{}'))
+        cls.url = default_storage.url(cls.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_file_response(self):
+        """Без прокси файл отдаёт FileResponse целиком."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), DATA)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(DATA)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_range(self):
+        """Запрос с Range получает только нужные байты."""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), DATA[10:20])
+        self.assertEqual(response['Content-Range'],
+                         f'bytes 10-19/{len(DATA)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), DATA[-5:])
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(DATA)}')
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9',
+                                   HTTP_IF_RANGE=http_date(0))
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(MEDIA_SERVING='x-accel-redirect',
+                       MEDIA_ACCEL_PREFIX='/internal/')
+    def test_x_accel_redirect(self):
+        """Nginx получает путь во внутреннем location, тело пустое."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/internal/{self.name}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        # Ответ для прокси не попадает в кэш страниц
+        self.assertNotIn('X-Page-Cache', response)
+
+    @override_settings(MEDIA_SERVING='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'],
+                         os.path.join(TEMP_MEDIA_ROOT, self.name))
+
+    def test_private_names(self):
+        """Отдаются только картинки постов и превью."""
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'secret.txt'), 'w') as file:
+            file.write('secret')
+        for path in ('/media/secret.txt', '/media/posts/../secret.txt',
+                     '/media/posts/missing.jpg', '/media/posts/.tmp',
+                     '/media/renditions/ab/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
+        self.assertEqual(
+            self.client.post(self.url).status_code, 405)
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range('bytes=2-100', 10), (2, 9))
+        self.assertEqual(parse_range('bytes=-20', 10), (0, 9))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 10))
+        self.assertIsNone(parse_range('items=0-1', 10))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=5-2', 10)
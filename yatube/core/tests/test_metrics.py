@@ -0,0 +1,97 @@
+import multiprocessing
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
+
+from .. import metrics
+
+
+def increment(directory):
+    with override_settings(METRICS_DIR=directory):
+        metrics.inc('yatube_posts_created_total', 2)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings_override = override_settings(METRICS_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    def scrape(self):
+        response = Client().get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_processes_are_summed(self):
+        """Значения из файлов разных процессов складываются."""
+        metrics.inc('yatube_posts_created_total')
+        process = multiprocessing.get_context('fork').Process(
+            target=increment, args=[self.directory])
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        self.assertIn('yatube_posts_created_total 3.0\n', self.scrape())
+
+    def test_store_grows(self):
+        """Файл процесса расширяется, значения сохраняются."""
+        for i in range(3000):
+            metrics.inc('yatube_http_responses_total', view=f'view{i}',
+                        status=200)
+        exposition = self.scrape()
+        self.assertIn('yatube_http_responses_total{status="200",'
+                      'view="view2999"} 1.0', exposition)
+
+    def test_request_metrics(self):
+        """Запрос к странице отражается в гистограмме, БД и кэше."""
+        Client().get(reverse('posts:index'))
+        exposition = self.scrape()
+        self.assertIn('yatube_http_request_duration_seconds_bucket'
+                      '{view="posts:index",le="+Inf"} 1.0', exposition)
+        self.assertIn('yatube_http_request_duration_seconds_count'
+                      '{view="posts:index"} 1.0', exposition)
+        self.assertIn('yatube_http_responses_total'
+                      '{status="200",view="posts:index"} 1.0', exposition)
+        self.assertRegex(exposition,
+                         r'yatube_db_queries_total\{database="default"\} '
+                         r'[1-9]')
+        self.assertIn('family="page",result="misses"', exposition)
+        self.assertIn('family="template.cache.index_page"', exposition)
+
+    def test_cached_page_has_view_name(self):
+        """Ответ из кэша страниц учитывается под именем URL."""
+        Client().get(reverse('posts:index'))
+        response = Client().get(reverse('posts:index'))
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertIn('yatube_http_request_duration_seconds_count'
+                      '{view="posts:index"} 2.0', self.scrape())
+
+    def test_created_objects(self):
+        """Создание постов, комментариев и подписок считается."""
+        post = Post.objects.create(text='Новый', author=self.author)
+        post.comments.create(text='Комментарий', author=self.reader)
+        Follow.objects.create(user=self.reader, author=self.author)
+        exposition = self.scrape()
+        for name in ('posts', 'comments', 'follows'):
+            self.assertIn(f'yatube_{name}_created_total 1.0\n', exposition)
+
+    def test_endpoint_is_not_cached(self):
+        """Страница метрик не попадает в кэш страниц."""
+        self.scrape()
+        response = Client().get('/metrics')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
@@ -0,0 +1,147 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User, UserStats
+
+from .. import routers
+
+REPLICA = 'replica'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TestCase):
+    """Реплика - отдельный файл SQLite с отстающими данными."""
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.directory, 'replica.sqlite3'),
+        }
+        call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.directory)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.author.save(using=REPLICA)
+        cls.replicated = Post.objects.create(text='Старый пост',
+                                             author=cls.author)
+        cls.replicated.save(using=REPLICA)
+        # Этот пост до реплики ещё не дошёл
+        cls.fresh = Post.objects.create(text='Свежий пост',
+                                        author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def texts(self, response):
+        return [post.text for post in response.context['page_obj']]
+
+    def test_read_views_use_replica(self):
+        """Ленты и страница поста читаются из реплики."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(self.texts(response), ['Старый пост'])
+        response = self.client.get(reverse('posts:profile',
+                                           args=[self.author.username]))
+        self.assertEqual(self.texts(response), ['Старый пост'])
+        response = self.client.get(reverse('posts:post_detail',
+                                           args=[self.fresh.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_other_views_use_primary(self):
+        """Остальные страницы читают из основной базы."""
+        response = self.client.get(reverse('posts:post_edit',
+                                           args=[self.fresh.id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_author_sees_own_write(self):
+        """После записи автор какое-то время читает из основной базы."""
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Только что'})
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(self.texts(response)[0], 'Только что')
+        other = Client()
+        other.force_login(User.objects.create_user(username='reader'))
+        response = other.get(reverse('posts:index'))
+        self.assertEqual(self.texts(response), ['Старый пост'])
+
+    def test_pin_after_follow(self):
+        """Подписка тоже закрепляет чтение за основной базой."""
+        reader = User.objects.create_user(username='reader')
+        self.client.force_login(reader)
+        response = self.client.get(reverse('posts:profile_follow',
+                                           args=[self.author.username]))
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_pin_expires(self):
+        """Просроченная отметка больше не действует."""
+        self.client.cookies[routers.PIN_COOKIE] = '1'
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(self.texts(response), ['Старый пост'])
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_counters_are_counted_on_primary(self):
+        """Строка счётчиков, созданная при чтении, считается по основной
+        базе, а не по отстающей реплике."""
+        UserStats.objects.all().delete()
+        response = self.client.get(reverse('posts:profile',
+                                           args=[self.author.username]))
+        self.assertEqual(self.texts(response), ['Старый пост'])
+        self.assertEqual(response.context['post_count'], 2)
+        self.assertEqual(
+            UserStats.objects.using('default').get(
+                user=self.author).posts_count, 2)
+
+    def test_page_cache_is_filled_from_primary(self):
+        """Промах кэша страниц читается из основной базы, и повторный
+        запрос гостя отдаётся из кэша."""
+        url = reverse('posts:index')
+        response = Client().get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertEqual(self.texts(response), ['Свежий пост', 'Старый пост'])
+        with self.assertNumQueries(0):
+            response = Client().get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+
+    def test_replica_reads_are_not_cached(self):
+        """Фрагменты, прочитанные из реплики, не сохраняются: иначе под
+        новым поколением надолго осталась бы старая лента."""
+        url = reverse('posts:index')
+        Client().get(url)
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(url)
+        self.assertEqual(self.texts(response), ['Старый пост'])
+        self.assertNotIn('X-Page-Cache', response)
+        response = Client().get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Новый пост')
+
+    def test_incidental_write_does_not_pin(self):
+        """Создание строки счётчиков при чтении профиля не закрепляет
+        посетителя за основной базой."""
+        UserStats.objects.all().delete()
+        response = Client().get(reverse('posts:profile',
+                                        args=[self.author.username]))
+        self.assertTrue(UserStats.objects.filter(user=self.author).exists())
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
@@ -0,0 +1,184 @@
+import shutil
+import tempfile
+import time
+from io import BytesIO
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post, User
+
+from ..storage import s3
+from ..storage.backends import FileSystemStorage, S3Storage
+from ..storage.config import storage_settings
+from ..storage.fakeserver import FakeS3Server
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class FakeS3Mixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeS3Server().start()
+        cls.storage_settings = storage_settings(cls.server.url)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        shutil.rmtree(cls.server.root, ignore_errors=True)
+        super().tearDownClass()
+
+    def make_storage(self, **options):
+        return S3Storage({**self.storage_settings[1], **options})
+
+
+class StorageSettingsTests(SimpleTestCase):
+    def test_default_is_filesystem(self):
+        """Без MEDIA_STORAGE_URL файлы лежат в MEDIA_ROOT."""
+        backend, options = storage_settings('')
+        self.assertEqual(backend, 'core.storage.backends.FileSystemStorage')
+        self.assertEqual(options, {})
+
+    def test_s3_url(self):
+        backend, options = storage_settings(
+            's3://key:p%40ss@minio.local:9000/media?region=eu-west-1'
+            '&secure=0&expires=600')
+        self.assertEqual(backend, 'core.storage.backends.S3Storage')
+        self.assertEqual(options['ENDPOINT'], 'http://minio.local:9000')
+        self.assertEqual(options['BUCKET'], 'media')
+        self.assertEqual(options['SECRET_KEY'], 'p@ss')
+        self.assertEqual(options['REGION'], 'eu-west-1')
+        self.assertEqual(options['URL_EXPIRES'], 600)
+
+
+class S3StorageTests(FakeS3Mixin, SimpleTestCase):
+    def test_multipart_upload(self):
+        """Большой файл уходит частями и читается обратно целиком."""
+        storage = self.make_storage(PART_SIZE=5 * 1024)
+        data = bytes(range(256)) * 100
+        uploads = self.server.multipart_uploads
+        name = storage.save('renditions/big.bin', ContentFile(data))
+        self.assertEqual(self.server.multipart_uploads, uploads + 1)
+        self.assertEqual(storage.size(name), len(data))
+        with storage.open(name) as file:
+            self.assertEqual(file.read(), data)
+        storage.delete(name)
+        self.assertFalse(storage.exists(name))
+
+    def test_part_boundaries(self):
+        """Файл ровно в одну часть уходит одним PUT, на байт больше или
+        ровно в две части - частями без пустого хвоста."""
+        part = 5 * 1024
+        storage = self.make_storage(PART_SIZE=part)
+        for size, multipart in ((part, 0), (part + 1, 1), (2 * part, 1)):
+            with self.subTest(size=size):
+                data = bytes(range(256)) * (size // 256) + b'x' * (size % 256)
+                uploads = self.server.multipart_uploads
+                name = storage.save('renditions/edge.bin', ContentFile(data))
+                self.assertEqual(self.server.multipart_uploads,
+                                 uploads + multipart)
+                with storage.open(name) as file:
+                    self.assertEqual(file.read(), data)
+                storage.delete(name)
+
+    def test_identical_uploads_share_key(self):
+        """Одинаковые картинки хранятся один раз."""
+        storage = self.make_storage()
+        first = storage.save('posts/a.JPG', ContentFile(b'same bytes'))
+        second = storage.save('posts/b.jpg', ContentFile(b'same bytes'))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('posts/'))
+        self.assertTrue(first.endswith('.jpg'))
+        other = storage.save('posts/c.jpg', ContentFile(b'other bytes'))
+        self.assertNotEqual(other, first)
+
+    def test_wrong_secret_is_rejected(self):
+        storage = self.make_storage(SECRET_KEY='wrong')
+        with self.assertRaises(s3.S3Error) as context:
+            storage.save('renditions/x.txt', ContentFile(b'x'))
+        self.assertEqual(context.exception.status, 403)
+
+    def test_signed_url(self):
+        """Файл скачивается по подписанной ссылке, подделка - нет."""
+        storage = self.make_storage()
+        name = storage.save('renditions/hello.txt', ContentFile(b'hello'))
+        url = storage.url(name)
+        self.assertEqual(url, storage.url(name))
+        response = requests.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'hello')
+        tampered = url.replace('hello.txt', 'other.txt')
+        self.assertEqual(requests.get(tampered).status_code, 403)
+        expired = storage.client.presign(name, 60, now=time.time() - 120)
+        self.assertEqual(requests.get(expired).status_code, 403)
+
+    def test_public_url(self):
+        storage = self.make_storage(PUBLIC_URL='https://cdn.example/media/')
+        self.assertEqual(storage.url('posts/a b.jpg'),
+                         'https://cdn.example/media/posts/a%20b.jpg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class FileSystemStorageTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_identical_uploads_share_file(self):
+        storage = FileSystemStorage()
+        first = storage.save('posts/a.jpg', ContentFile(b'same bytes'))
+        second = storage.save('posts/b.jpg', ContentFile(b'same bytes'))
+        self.assertEqual(first, second)
+        # Остальные имена сохраняются как прежде
+        self.assertEqual(
+            storage.save('renditions/a.jpg', ContentFile(b'x')),
+            'renditions/a.jpg')
+
+
+class S3PostImageTests(FakeS3Mixin, TestCase):
+    def setUp(self):
+        backend, options = self.storage_settings
+        override = override_settings(DEFAULT_FILE_STORAGE=backend,
+                                     MEDIA_STORAGE=options)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+
+    def test_post_image_and_renditions(self):
+        """Картинка поста и её превью лежат в объектном хранилище."""
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), 'blue').save(buffer, 'JPEG')
+        post = Post.objects.create(
+            text='Пост', author=self.author,
+            image=SimpleUploadedFile('big.jpg', buffer.getvalue(),
+                                     content_type='image/jpeg'))
+        self.assertIsInstance(default_storage._wrapped, S3Storage)
+        self.assertTrue(default_storage.exists(post.image.name))
+
+        thumbnails.render(post.image.name, post.id)
+        manifest = thumbnails.lookup(post.image)
+        self.assertIsNotNone(manifest)
+        key = manifest['default']
+        self.assertTrue(self.server.object_path(key).startswith(
+            self.server.root))
+        self.assertTrue(default_storage.exists(key))
+
+        response = Client().get(reverse('posts:post_detail',
+                                        args=[post.id]))
+        url = default_storage.url(key)
+        self.assertIn('X-Amz-Signature=', url)
+        self.assertContains(response, url.replace('&', '&amp;'))
+        image = requests.get(url)
+        self.assertEqual(image.status_code, 200)
+        self.assertEqual(image.headers['Content-Type'], 'image/jpeg')
@@ -0,0 +1,43 @@
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from ..context_processors import year
+
+
+class TemplateProfileTests(SimpleTestCase):
+    def test_cached_loader(self):
+        """Шаблоны загружаются через кэширующий загрузчик."""
+        loaders = engines['django'].engine.template_loaders
+        self.assertIsInstance(loaders[0], CachedLoader)
+
+    def test_year_is_computed_once_per_day(self):
+        """Год пересчитывается только после полуночи."""
+        moments = [
+            timezone.make_aware(datetime(2030, 12, 31, 10)),
+            timezone.make_aware(datetime(2030, 12, 31, 23, 59)),
+            timezone.make_aware(datetime(2031, 1, 1, 0, 1)),
+        ]
+        with mock.patch.object(year, '_expires_at', None), \
+                mock.patch.object(year.timezone, 'now',
+                                  side_effect=moments), \
+                mock.patch.object(year.timezone, 'localtime',
+                                  wraps=timezone.localtime) as localtime:
+            self.assertEqual(year.year(None), {'year': 2030})
+            self.assertEqual(year.year(None), {'year': 2030})
+            self.assertEqual(localtime.call_count, 1)
+            self.assertEqual(year.year(None), {'year': 2031})
+            self.assertEqual(localtime.call_count, 2)
+
+    def test_bench_render(self):
+        """Замер отрисовки лент работает без базы данных."""
+        out = StringIO()
+        call_command('bench_render', iterations=2, stdout=out)
+        self.assertIn('posts/index.html [cold]', out.getvalue())
+        self.assertIn('posts/post_detail.html [warm]', out.getvalue())
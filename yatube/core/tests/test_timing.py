@@ -0,0 +1,60 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from .. import timing
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_literals_are_collapsed(self):
+        """Запросы одной формы дают один отпечаток."""
+        self.assertEqual(
+            timing.fingerprint(
+                "SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'"),
+            timing.fingerprint(
+                'SELECT * FROM t  WHERE id IN (%s) AND name = %s'),
+        )
+
+
+class TimingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(text='Пост', author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1)
+    def test_sampled_request(self):
+        """Выбранный запрос получает Server-Timing и строку лога."""
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            response = Client().get(reverse('posts:index'))
+        header = response['Server-Timing']
+        self.assertRegex(header, r'^db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('tpl;dur=', header)
+        self.assertRegex(header, r'total;dur=[\d.]+$')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['tpl_ms'], 0)
+        self.assertEqual(len(record['slowest_fingerprint']), 12)
+        self.assertEqual(logs.records[0].timing, record)
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        """Без выборки запрос не замеряется."""
+        response = Client().get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertIsNone(timing.current())
+
+    def test_timed_outside_request(self):
+        """Замер вне запроса ничего не делает."""
+        with timing.timed('thumb'):
+            pass
+        self.assertIsNone(timing.current())
@@ -0,0 +1,166 @@
+"""Sampled per-request timings: SQL, template rendering and thumbnails.
+
+For a sampled request ``TimingMiddleware`` wraps every database connection
+with ``connection.execute_wrapper`` and opens a ``Timings`` record that
+``timed()`` blocks and the template backend below add their time to. The
+totals go to the ``Server-Timing`` header and to one JSON log line per
+request; settings send the log to a ``NullHandler`` unless
+``REQUEST_TIMING_LOG=1``. Requests outside the sample pay for a single
+``random()`` call.
+"""
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 0.01
+SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+SQL_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+SQL_SPACE_RE = re.compile(r'\s+')
+
+_local = threading.local()
+
+
+def fingerprint(sql):
+    """Shape of a query: literals and placeholder lists collapsed."""
+    shape = SQL_LITERAL_RE.sub('?', sql)
+    shape = SQL_LIST_RE.sub('(...)', shape)
+    return SQL_SPACE_RE.sub(' ', shape).strip()
+
+
+class Timings:
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.slowest = (0.0, None)
+        self.spans = {}
+
+    def add(self, name, duration):
+        self.spans[name] = self.spans.get(name, 0.0) + duration
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.sql += duration
+            if duration > self.slowest[0]:
+                self.slowest = (duration, sql)
+
+
+def current():
+    """``Timings`` of the request being sampled in this thread, or None."""
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def timed(name):
+    timings = current()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+class TimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_TIMING_SAMPLE_RATE',
+                                   SAMPLE_RATE)
+
+    def __call__(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return self.get_response(request)
+        timings = _local.timings = Timings()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.execute))
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        total = time.perf_counter() - start
+        response['Server-Timing'] = self.header(timings, total)
+        self.log(request, response, timings, total)
+        return response
+
+    @staticmethod
+    def header(timings, total):
+        metrics = [
+            f'db;dur={timings.sql * 1000:.1f};'
+            f'desc="{timings.queries} queries"'
+        ]
+        metrics += [
+            f'{name};dur={duration * 1000:.1f}'
+            for name, duration in timings.spans.items()
+        ]
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+    @staticmethod
+    def log(request, response, timings, total):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'queries': timings.queries,
+            'sql_ms': round(timings.sql * 1000, 2),
+        }
+        record.update({
+            f'{name}_ms': round(duration * 1000, 2)
+            for name, duration in timings.spans.items()
+        })
+        duration, sql = timings.slowest
+        if sql is not None:
+            shape = fingerprint(sql)
+            record.update({
+                'slowest_ms': round(duration * 1000, 2),
+                'slowest_fingerprint': hashlib.md5(
+                    shape.encode()).hexdigest()[:12],
+                'slowest_sql': shape[:200],
+            })
+        logger.info(json.dumps(record, ensure_ascii=False),
+                    extra={'timing': record})
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with timed('tpl'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Django templates backend that reports render time to ``timed()``.
+
+    Only templates loaded through the backend are timed, so includes and
+    inclusion tags count as part of the page that uses them.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except django_backend.TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
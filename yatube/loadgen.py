@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""Replay a mix of requests through ``yatube.wsgi.application``.
+
+Requests are built as WSGI environs and handed straight to the
+application from a pool of threads, so the numbers cover Django, the
+database and the caches but no HTTP server. Seed data first with
+``python manage.py seed_yatube``.
+
+    python loadgen.py --requests 2000 --concurrency 8 \\
+        --mix index=50,profile=20,post_detail=20,follow_index=8,post_create=2
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+DEFAULT_MIX = ('index=50,profile=20,post_detail=20,follow_index=8,'
+               'post_create=2')
+SAMPLE_SIZE = 1000
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(Scenario.builders)
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f'unknown views: {", ".join(sorted(unknown))}')
+    return mix
+
+
+class Scenario:
+    """Random targets and sessions prepared from the seeded database.
+
+    Each builder returns ``(method, path, data, anonymous_share)``; pages
+    behind ``login_required`` are always requested with a session.
+    """
+    builders = {
+        'index': lambda self: ('GET', '/', None, self.anonymous_share),
+        'profile': lambda self: (
+            'GET', f'/profile/{self.random.choice(self.usernames)}/', None,
+            self.anonymous_share),
+        'post_detail': lambda self: (
+            'GET', f'/posts/{self.random.choice(self.post_ids)}/', None,
+            self.anonymous_share),
+        'follow_index': lambda self: ('GET', '/follow/', None, 0),
+        'post_create': lambda self: (
+            'POST', '/create/', {'text': 'Нагрузочный пост'}, 0),
+    }
+
+    def __init__(self, users, anonymous_share, seed):
+        from django.contrib.auth import (BACKEND_SESSION_KEY,
+                                         HASH_SESSION_KEY, SESSION_KEY,
+                                         get_user_model)
+        from django.contrib.sessions.backends.db import SessionStore
+        from django.middleware.csrf import _get_new_csrf_token
+        from posts.models import Post
+
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.anonymous_share = anonymous_share
+        User = get_user_model()
+        self.usernames = list(User.objects.order_by('?').values_list(
+            'username', flat=True)[:SAMPLE_SIZE])
+        self.post_ids = list(Post.objects.order_by('?').values_list(
+            'id', flat=True)[:SAMPLE_SIZE])
+        if not self.usernames or not self.post_ids:
+            sys.exit('No data: run "python manage.py seed_yatube" first')
+        self.sessions = []
+        for user in User.objects.order_by('?')[:users]:
+            session = SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = (
+                'django.contrib.auth.backends.ModelBackend')
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.create()
+            self.sessions.append((session.session_key, _get_new_csrf_token()))
+
+    def next_request(self, names, weights):
+        with self.lock:
+            name = self.random.choices(names, weights)[0]
+            method, path, data, anonymous_share = self.builders[name](self)
+            session = None
+            if self.random.random() >= anonymous_share:
+                session = self.random.choice(self.sessions)
+        return name, environ(method, path, data, session)
+
+
+def environ(method, path, data, session):
+    from django.conf import settings
+
+    body = urlencode(data or {}).encode()
+    env = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'HTTP_HOST': 'localhost',
+        'wsgi.input': BytesIO(body),
+        'CONTENT_LENGTH': str(len(body)),
+    }
+    if method == 'POST':
+        env['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+    if session is not None:
+        session_key, csrf_token = session
+        env['HTTP_COOKIE'] = (
+            f'{settings.SESSION_COOKIE_NAME}={session_key}; '
+            f'{settings.CSRF_COOKIE_NAME}={csrf_token}')
+        env['HTTP_X_CSRFTOKEN'] = csrf_token
+    setup_testing_defaults(env)
+    return env
+
+
+def call(application, env):
+    status = []
+
+    def start_response(value, headers, exc_info=None):
+        status.append(int(value.split()[0]))
+
+    start = time.perf_counter()
+    result = application(env, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return status[0], time.perf_counter() - start
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def report(results, elapsed):
+    lines = [f'{"view":<14}{"count":>7}{"errors":>8}'
+             f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}']
+    groups = {}
+    for name, status, duration in results:
+        groups.setdefault(name, []).append((status, duration))
+    groups['total'] = [(status, duration) for _, status, duration in results]
+    for name, rows in groups.items():
+        durations = [duration * 1000 for _, duration in rows]
+        errors = sum(status >= 400 for status, _ in rows)
+        lines.append(
+            f'{name:<14}{len(rows):>7}{errors:>8}'
+            f'{statistics.median(durations):>9.1f}'
+            f'{percentile(durations, 0.95):>9.1f}'
+            f'{percentile(durations, 0.99):>9.1f}')
+    lines.append(f'throughput: {len(results) / elapsed:.1f} req/s '
+                 f'over {elapsed:.1f} s')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument('--users', type=int, default=50,
+                        help='logged-in sessions to spread requests over')
+    parser.add_argument('--anonymous', type=float, default=0.5,
+                        help='share of public page views made by guests')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    options = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    from yatube.wsgi import application
+
+    scenario = Scenario(options.users, options.anonymous, options.seed)
+    names, weights = zip(*options.mix.items())
+    for _ in range(options.warmup):
+        call(application, scenario.next_request(names, weights)[1])
+
+    def worker(_):
+        name, env = scenario.next_request(names, weights)
+        status, duration = call(application, env)
+        return name, status, duration
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(options.concurrency) as executor:
+        results = list(executor.map(worker, range(options.requests)))
+    print(report(results, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Per-view benchmarks compared against a committed baseline.
+
+Every case is one request made through the test client with the caches
+cleared, so each run repeats the whole work of the view. For each case the
+median over the iterations of the total time, the time spent in SQL and in
+template rendering is recorded together with the number of queries and the
+peak of memory allocated while handling the request.
+"""
+import statistics
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.template.base import Template
+from django.test import Client
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import Follow, Group, Post, User
+
+METRICS = ('queries', 'query_ms', 'render_ms', 'total_ms', 'alloc_kib')
+# Изменения меньше этих величин считаем шумом замера
+SLACK = {'queries': 0, 'query_ms': 1.0, 'render_ms': 1.0, 'total_ms': 2.0,
+         'alloc_kib': 64}
+ALLOC_ITERATIONS = 3
+
+
+class Case:
+    """One request: ``user`` is None for guests."""
+
+    def __init__(self, name, path, user=None, method='get', data=None):
+        self.name = name
+        self.path = path
+        self.user = user
+        self.method = method
+        self.data = data
+
+
+def cases():
+    """Every view of ``posts.urls`` and ``users.urls`` on the current data."""
+    post = Post.objects.select_related('author').order_by('pk').first()
+    author = post.author
+    reader = Follow.objects.filter(author=author).values_list(
+        'user', flat=True).first()
+    reader = User.objects.get(pk=reader) if reader else User.objects.exclude(
+        pk=author.pk).first()
+    stranger = User.objects.exclude(pk__in=[author.pk, reader.pk]).exclude(
+        pk__in=Follow.objects.filter(user=reader).values('author')).first()
+    group = Group.objects.order_by('pk').first()
+    uid = urlsafe_base64_encode(force_bytes(author.pk))
+    token = default_token_generator.make_token(author)
+    return [
+        Case('posts:index', reverse('posts:index')),
+        Case('posts:index[user]', reverse('posts:index'), reader),
+        Case('posts:group_list', reverse('posts:group_list',
+                                         args=[group.slug])),
+        Case('posts:profile', reverse('posts:profile',
+                                      args=[author.username])),
+        Case('posts:post_detail', reverse('posts:post_detail',
+                                          args=[post.pk])),
+        Case('posts:post_comments', reverse('posts:post_comments',
+                                            args=[post.pk])),
+        Case('posts:search', reverse('posts:search') + '?q=кот'),
+        Case('posts:follow_index', reverse('posts:follow_index'), reader),
+        Case('posts:post_create', reverse('posts:post_create'), author),
+        Case('posts:post_create[post]', reverse('posts:post_create'),
+             author, 'post', {'text': 'Пост из замера'}),
+        Case('posts:post_edit', reverse('posts:post_edit', args=[post.pk]),
+             author),
+        Case('posts:add_comment', reverse('posts:add_comment',
+                                          args=[post.pk]),
+             reader, 'post', {'text': 'Комментарий из замера'}),
+        Case('posts:profile_follow', reverse(
+            'posts:profile_follow', args=[stranger.username]), reader),
+        Case('posts:profile_unfollow', reverse(
+            'posts:profile_unfollow', args=[author.username]), reader),
+        Case('posts:follow_bulk', reverse('posts:follow_bulk'), reader,
+             'post', {'follow': [stranger.username],
+                      'unfollow': [author.username]}),
+        Case('users:signup', reverse('users:signup')),
+        Case('users:login', reverse('users:login')),
+        Case('users:logout', reverse('users:logout'), reader),
+        Case('users:password_change', reverse('users:password_change'),
+             reader),
+        Case('users:password_change_done',
+             reverse('users:password_change_done'), reader),
+        Case('users:password_reset', reverse('users:password_reset')),
+        Case('users:password_reset_done',
+             reverse('users:password_reset_done')),
+        Case('users:password_reset_confirm', reverse(
+            'users:password_reset_confirm', args=[uid, token])),
+        Case('users:password_reset_complete',
+             reverse('users:password_reset_complete')),
+    ]
+
+
+class Probe:
+    """Accumulates SQL and template time of the current request."""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.render_time = 0.0
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_time += time.perf_counter() - start
+
+    @contextmanager
+    def templates(self):
+        probe = self
+        render = Template.render
+
+        def timed_render(template, context):
+            # Вложенные include считаются в составе внешнего шаблона
+            depth = getattr(probe.local, 'depth', 0)
+            probe.local.depth = depth + 1
+            start = time.perf_counter()
+            try:
+                return render(template, context)
+            finally:
+                probe.local.depth = depth
+                if not depth:
+                    probe.render_time += time.perf_counter() - start
+
+        Template.render = timed_render
+        try:
+            yield
+        finally:
+            Template.render = render
+
+
+def request(client, case):
+    # Состояние базы возвращается после каждого запроса
+    with transaction.atomic():
+        response = getattr(client, case.method)(case.path, case.data or {})
+        transaction.set_rollback(True)
+    return response
+
+
+def measure(case, iterations):
+    client = Client()
+    probe = Probe()
+    samples = {metric: [] for metric in METRICS}
+    with probe.templates(), connection.execute_wrapper(probe.execute):
+        for i in range(iterations + ALLOC_ITERATIONS + 1):
+            if case.user is not None:
+                client.force_login(case.user)
+            cache.clear()
+            probe.reset()
+            # Первый запрос прогревает, последние идут под tracemalloc,
+            # который сильно замедляет всё остальное
+            tracing = i > iterations
+            if tracing:
+                tracemalloc.start()
+            start = time.perf_counter()
+            response = request(client, case)
+            total = time.perf_counter() - start
+            if tracing:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                samples['alloc_kib'].append(peak / 1024)
+            elif i:
+                samples['queries'].append(probe.queries)
+                samples['query_ms'].append(probe.query_time * 1000)
+                samples['render_ms'].append(probe.render_time * 1000)
+                samples['total_ms'].append(total * 1000)
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f'{case.name}: {case.path} answered {response.status_code}')
+    result = {
+        metric: round(statistics.median(values), 3)
+        for metric, values in samples.items() if metric != 'queries'
+    }
+    # Число запросов стабильно, берём худший случай
+    result['queries'] = max(samples['queries'])
+    result['status'] = response.status_code
+    return result
+
+
+def run(iterations, only=None):
+    return {
+        case.name: measure(case, iterations)
+        for case in cases()
+        if not only or any(name in case.name for name in only)
+    }
+
+
+def compare(results, baseline, threshold):
+    """Regressions of ``results`` against ``baseline`` as readable lines.
+
+    A metric regresses when it grows by more than ``threshold`` (a share
+    of the baseline) and by more than its ``SLACK``; any extra query is a
+    regression.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in METRICS:
+            if metric not in previous:
+                continue
+            before, after = previous[metric], current[metric]
+            allowed = 0 if metric == 'queries' else before * threshold
+            if after - before > max(allowed, SLACK[metric]):
+                regressions.append(
+                    f'{name}: {metric} {before} -> {after} '
+                    f'(+{(after - before) / (before or 1):.0%})')
+    return regressions
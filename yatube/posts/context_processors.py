@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from .follows import followed_ids
+
+
+def followed_authors(request):
+    # Множество берётся из кэша, только если шаблон к нему обратится
+    return {
+        'followed_authors': SimpleLazyObject(
+            lambda: followed_ids(request.user.id)),
+    }
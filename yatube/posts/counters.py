@@ -0,0 +1,91 @@
+"""Denormalized counters for authors and posts.
+
+Rows of ``UserStats``/``PostStats`` are created lazily from real counts
+the first time they are needed and then moved by ``F()`` increments from
+the signal handlers, so profile and detail pages never run ``COUNT(*)``.
+``manage.py reconcile_counters`` repairs any drift in bulk.
+"""
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, PostStats, UserStats
+
+
+def count_user(user_id, using=None):
+    return {
+        'posts_count': Post.objects.using(using).filter(
+            author_id=user_id).count(),
+        'comments_count': Comment.objects.using(using).filter(
+            author_id=user_id).count(),
+        'followers_count': Follow.objects.using(using).filter(
+            author_id=user_id).count(),
+        'following_count': Follow.objects.using(using).filter(
+            user_id=user_id).count(),
+    }
+
+
+def count_of(queryset, field):
+    """Correlated ``COUNT(*)`` of ``queryset`` rows per ``field``."""
+    counted = queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+        field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def count_post(post_id, using=None):
+    return {
+        'comments_count': Comment.objects.using(using).filter(
+            post_id=post_id).count(),
+    }
+
+
+def _load(model, pk, recount):
+    try:
+        return model.objects.get(pk=pk)
+    except model.DoesNotExist:
+        pass
+    # Реплика могла не видеть ни строку, ни последние изменения: считаем
+    # и создаём строку в основной базе
+    db = router.db_for_write(model)
+    try:
+        with transaction.atomic(using=db):
+            return model.objects.using(db).create(pk=pk, **recount(pk, db))
+    except IntegrityError:
+        return model.objects.using(db).get(pk=pk)
+
+
+def _bump(model, pk, recount, field, delta):
+    rows = model.objects.filter(pk=pk)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    updated = rows.update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        # Первое событие для объекта: строка считается по факту
+        _load(model, pk, recount)
+
+
+def user_stats(user_id):
+    return _load(UserStats, user_id, count_user)
+
+
+def post_stats(post_id):
+    return _load(PostStats, post_id, count_post)
+
+
+def bump_user(user_id, field, delta):
+    _bump(UserStats, user_id, count_user, field, delta)
+
+
+def bump_post(post_id, field, delta):
+    _bump(PostStats, post_id, count_post, field, delta)
+
+
+def recount_follows(user_ids=(), author_ids=()):
+    """Set the follow counters of existing rows from real counts with one
+    ``UPDATE`` per side; used after follows changed in bulk."""
+    if author_ids:
+        UserStats.objects.filter(pk__in=author_ids).update(
+            followers_count=count_of(Follow.objects.all(), 'author_id'))
+    if user_ids:
+        UserStats.objects.filter(pk__in=user_ids).update(
+            following_count=count_of(Follow.objects.all(), 'user_id'))
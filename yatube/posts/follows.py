@@ -0,0 +1,218 @@
+"""Follow graph helpers.
+
+``follow_many``/``unfollow_many`` apply many ``(user_id, author_id)`` pairs
+at once for the bulk endpoint and ``manage.py import_follows``. Rows are
+inserted with one conflict-ignoring ``INSERT`` per batch and removed with
+one ``DELETE``, both with ``RETURNING`` the pairs they touched, so the
+unique constraint on ``Follow`` settles races and nothing is read up
+front. SQLite before 3.35 has no ``RETURNING`` and gets one statement per
+pair, its row count telling whether the pair was new. Per-row signals do
+not run: counters, author generations, timelines, metrics and cached sets
+are updated here for the whole batch instead.
+
+``followed_ids`` answers "does this user follow X" without a query: the
+sorted ids of followed authors are cached per user as a packed array of
+unsigned ints. Adding or removing a follow drops the cached array, and
+the next ``followed_ids`` reloads it. The array is never patched in place,
+because two concurrent writers would overwrite each other's changes.
+"""
+import sqlite3
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import Q
+
+from core import metrics
+
+from . import counters, timeline, versions
+from .models import Follow, UserStats
+
+BATCH_SIZE = 500
+CACHE_PREFIX = 'followed'
+# Чтение, начатое до коммита, может положить старое множество уже после
+# сброса, поэтому оно всё равно перечитывается из базы раз в сутки
+CACHE_TIMEOUT = 60 * 60 * 24
+TYPECODE = 'I'
+
+
+class FollowedIds:
+    """Sorted author ids; ``in`` is a binary search over the array."""
+
+    __slots__ = ('ids',)
+
+    def __init__(self, ids=()):
+        self.ids = ids if isinstance(ids, array) else array(TYPECODE, ids)
+
+    def __contains__(self, author_id):
+        index = bisect_left(self.ids, author_id)
+        return index < len(self.ids) and self.ids[index] == author_id
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _cache_key(user_id):
+    return f'{CACHE_PREFIX}:{user_id}'
+
+
+def followed_ids(user_id):
+    """Ids of the authors ``user_id`` follows; empty for guests."""
+    if user_id is None:
+        return FollowedIds()
+    packed = cache.get(_cache_key(user_id))
+    if packed is not None:
+        ids = array(TYPECODE)
+        ids.frombytes(packed)
+        return FollowedIds(ids)
+    ids = array(TYPECODE, Follow.objects.filter(user_id=user_id).order_by(
+        'author_id').values_list('author_id', flat=True))
+    cache.set(_cache_key(user_id), ids.tobytes(), CACHE_TIMEOUT)
+    return FollowedIds(ids)
+
+
+def forget_followed(pairs):
+    """Drop the cached sets of the users in ``pairs``.
+
+    The keys are deleted right away and again after the commit: a reader
+    may reload the old set from the database in between.
+    """
+    keys = list({_cache_key(user_id) for user_id, _ in pairs})
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def batches(pairs, size=BATCH_SIZE):
+    pairs = sorted(pairs)
+    for start in range(0, len(pairs), size):
+        yield pairs[start:start + size]
+
+
+def pairs_filter(pairs):
+    authors = {}
+    for user_id, author_id in pairs:
+        authors.setdefault(user_id, set()).add(author_id)
+    condition = Q()
+    for user_id, author_ids in authors.items():
+        condition |= Q(user_id=user_id, author_id__in=author_ids)
+    return condition
+
+
+def can_return(connection):
+    if connection.vendor == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 35)
+    return connection.vendor == 'postgresql'
+
+
+def _columns(connection):
+    quote = connection.ops.quote_name
+    return [quote(name) for name in (
+        Follow._meta.db_table, Follow._meta.pk.column,
+        Follow._meta.get_field('user').column,
+        Follow._meta.get_field('author').column)]
+
+
+def insert(connection, batch):
+    """Insert the pairs of ``batch``; returns those that were new."""
+    table, _, user, author = _columns(connection)
+    ops = connection.ops
+    head = (f'{ops.insert_statement(ignore_conflicts=True)} {table} '
+            f'({user}, {author}) VALUES ')
+    tail = ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    with connection.cursor() as cursor:
+        if can_return(connection):
+            values = ', '.join(['(%s, %s)'] * len(batch))
+            cursor.execute(
+                f'{head}{values}{tail} RETURNING {user}, {author}',
+                [value for pair in batch for value in pair])
+            return set(map(tuple, cursor.fetchall()))
+        created = set()
+        for pair in batch:
+            cursor.execute(f'{head}(%s, %s){tail}', pair)
+            if cursor.rowcount:
+                created.add(pair)
+        return created
+
+
+def delete(connection, batch):
+    """Delete the pairs of ``batch``; returns those that existed."""
+    table, pk, user, author = _columns(connection)
+    with connection.cursor() as cursor:
+        if can_return(connection):
+            query = Follow.objects.filter(pairs_filter(batch)).values(
+                'pk').query
+            ids, params = query.get_compiler(
+                connection=connection).as_sql()
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {pk} IN ({ids}) '
+                f'RETURNING {user}, {author}', params)
+            return set(map(tuple, cursor.fetchall()))
+        sql = f'DELETE FROM {table} WHERE {user} = %s AND {author} = %s'
+        deleted = set()
+        for pair in batch:
+            cursor.execute(sql, pair)
+            if cursor.rowcount:
+                deleted.add(pair)
+        return deleted
+
+
+def follow_many(pairs):
+    """Create the missing follows; returns the pairs that were new.
+
+    Self-follows are skipped; ids must belong to existing users.
+    """
+    pairs = {(user_id, author_id) for user_id, author_id in pairs
+             if user_id != author_id}
+    db = router.db_for_write(Follow)
+    created = set()
+    with transaction.atomic(using=db):
+        for batch in batches(pairs):
+            created.update(insert(connections[db], batch))
+        if not created:
+            return set()
+        changed(created)
+        forget_followed(created)
+        timeline.backfill_many(created)
+    metrics.inc('yatube_follows_created_total', len(created))
+    return created
+
+
+def unfollow_many(pairs):
+    """Delete the given follows; returns the pairs that existed."""
+    pairs = set(pairs)
+    db = router.db_for_write(Follow)
+    deleted = set()
+    heavy = set()
+    with transaction.atomic(using=db):
+        for batch in batches(pairs):
+            heavy.update(UserStats.objects.filter(
+                user_id__in={author_id for _, author_id in batch},
+                followers_count__gt=timeline.FANOUT_FOLLOWERS_LIMIT,
+            ).values_list('user_id', flat=True))
+            deleted.update(delete(connections[db], batch))
+        if deleted:
+            changed(deleted)
+            forget_followed(deleted)
+            timeline.prune_many(deleted)
+            # Авторы, ставшие обычными, снова раздаются по лентам
+            for author_id in UserStats.objects.filter(
+                    user_id__in=heavy,
+                    followers_count__lte=timeline.FANOUT_FOLLOWERS_LIMIT,
+            ).values_list('user_id', flat=True):
+                timeline.backfill_author(author_id)
+    return deleted
+
+
+def changed(pairs):
+    user_ids = sorted({user_id for user_id, _ in pairs})
+    author_ids = sorted({author_id for _, author_id in pairs})
+    # Число подписчиков выводится в профилях авторов
+    versions.bump(*(versions.author_scope(author_id)
+                    for author_id in author_ids))
+    for start in range(0, max(len(user_ids), len(author_ids)), BATCH_SIZE):
+        counters.recount_follows(user_ids[start:start + BATCH_SIZE],
+                                 author_ids[start:start + BATCH_SIZE])
@@ -0,0 +1,97 @@
+import statistics
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from posts.forms import CommentForm
+from posts.models import Comment, Group, Post, User
+from posts.views import POSTS_PER_PAGE
+
+
+class Command(BaseCommand):
+    help = ('Measure render time of posts/index.html and '
+            'posts/post_detail.html with a full page of posts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--comments', type=int, default=POSTS_PER_PAGE)
+
+    def handle(self, *args, **options):
+        loaders = settings.TEMPLATES[0]['OPTIONS'].get('loaders')
+        self.stdout.write(f'Loaders: {loaders}')
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        posts = self.make_posts(POSTS_PER_PAGE)
+        cases = {
+            'posts/index.html': {
+                'title': 'Последние обновления на сайте',
+                'page_obj': Paginator(posts, POSTS_PER_PAGE).page(1),
+                'index': True,
+            },
+            'posts/post_detail.html': {
+                'title': posts[0].text[:30],
+                'post': posts[0],
+                'post_count': POSTS_PER_PAGE,
+                'comments_count': options['comments'],
+                'comments': self.make_comments(posts[0],
+                                               options['comments']),
+                'form': CommentForm(),
+            },
+        }
+        for template, context in cases.items():
+            # cold: фрагменты не найдены в кэше; warm: все фрагменты готовы
+            for profile in ('cold', 'warm'):
+                timings = self.measure(template, context, request, profile,
+                                       options['iterations'])
+                self.stdout.write(self.summary(template, profile, timings))
+
+    @staticmethod
+    def measure(template, context, request, profile, iterations):
+        timings = []
+        for i in range(iterations):
+            version = i if profile == 'cold' else 'warm'
+            context = {**context, 'cache_timeout': 60,
+                       'cache_version': f'bench={version}'}
+            start = time.perf_counter()
+            render_to_string(template, context, request)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    @staticmethod
+    def summary(template, profile, timings):
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(
+            timings) > 1 else timings[0]
+        return (f'{template} [{profile}]: '
+                f'mean {statistics.mean(timings):.2f} ms, '
+                f'p50 {statistics.median(timings):.2f} ms, '
+                f'p95 {p95:.2f} ms')
+
+    @staticmethod
+    def make_posts(count):
+        # Несохранённые объекты: шаблоны не должны обращаться к базе
+        author = User(id=1, username='bench', first_name='Лев',
+                      last_name='Толстой')
+        group = Group(id=1, title='Группа', slug='bench',
+                      description='Описание')
+        pub_date = timezone.make_aware(datetime(2022, 5, 1))
+        return [
+            Post(id=i, text=f'Пост номер {i} ' * 20, author=author,
+                 group=group, pub_date=pub_date)
+            for i in range(1, count + 1)
+        ]
+
+    @staticmethod
+    def make_comments(post, count):
+        created = timezone.make_aware(datetime(2022, 5, 2))
+        return [
+            Comment(id=i, post=post, author=post.author, created=created,
+                    text=f'Комментарий {i}')
+            for i in range(1, count + 1)
+        ]
@@ -0,0 +1,81 @@
+import json
+import os
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+
+from posts import benchmarks
+
+BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+# Фиксированный набор данных, на котором снят базовый замер
+DATASET = {'users': 60, 'groups': 5, 'posts': 1000, 'comments': 2000,
+           'follows': 10, 'seed': 0}
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every posts and users view on a seeded test database '
+            'and compare the numbers with a committed baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--baseline', default=BASELINE)
+        parser.add_argument('--output',
+                            help='JSON file for the results of this run')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='allowed growth of a metric, as a share')
+        parser.add_argument('--update', action='store_true',
+                            help='write the results as the new baseline')
+        parser.add_argument('--view', action='append', dest='views',
+                            help='only cases whose name contains this; '
+                                 'may be repeated')
+
+    def handle(self, *args, **options):
+        # Отдельная тестовая база: замеры не трогают рабочие данные
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            call_command('seed_yatube', batch_size=500, stdout=StringIO(),
+                         **DATASET)
+            results = benchmarks.run(options['iterations'],
+                                     options['views'])
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+        report = {'dataset': DATASET, 'iterations': options['iterations'],
+                  'views': results}
+        for name, metrics in results.items():
+            self.stdout.write(f'{name:<34}' + ' '.join(
+                f'{metric} {metrics[metric]}'
+                for metric in benchmarks.METRICS))
+        if options['output']:
+            self.write(options['output'], report)
+        if options['update']:
+            self.write(options['baseline'], report)
+            self.stdout.write(f'Baseline written to {options["baseline"]}')
+            return
+        if not os.path.exists(options['baseline']):
+            raise CommandError(f'No baseline at {options["baseline"]}; '
+                               'run with --update to record one')
+        with open(options['baseline']) as file:
+            baseline = json.load(file)
+        if baseline.get('dataset') != DATASET:
+            raise CommandError('Baseline was recorded on another dataset')
+        regressions = benchmarks.compare(results, baseline['views'],
+                                         options['threshold'])
+        if regressions:
+            raise CommandError('Performance regressions:\n' +
+                               '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions'))
+
+    @staticmethod
+    def write(path, report):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+            file.write('\n')
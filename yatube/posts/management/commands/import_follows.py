@@ -0,0 +1,60 @@
+import csv
+import sys
+from contextlib import nullcontext
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import follows
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Create (or with --unfollow delete) follows from a CSV file of '
+            '"user,author" pairs, in batches without per-row signals.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file, "-" reads stdin')
+        parser.add_argument('--ids', action='store_true',
+                            help='columns hold user ids, not usernames')
+        parser.add_argument('--unfollow', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        apply = (follows.unfollow_many if options['unfollow']
+                 else follows.follow_many)
+        changed = skipped = 0
+        try:
+            opened = (nullcontext(sys.stdin) if path == '-'
+                      else open(path, newline=''))
+        except OSError as error:
+            raise CommandError(error)
+        with opened as file:
+            rows = csv.reader(file)
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                pairs = self.resolve(batch, options['ids'])
+                skipped += len(batch) - len(pairs)
+                changed += len(apply(pairs))
+        verb = 'deleted' if options['unfollow'] else 'created'
+        self.stdout.write(f'{changed} follows {verb}, {skipped} rows '
+                          'skipped')
+
+    def resolve(self, rows, ids):
+        """``(user_id, author_id)`` of rows naming two existing users."""
+        rows = [(row[0].strip(), row[1].strip()) for row in rows
+                if len(row) >= 2]
+        if ids:
+            rows = [(int(user), int(author)) for user, author in rows
+                    if user.isdigit() and author.isdigit()]
+        field = 'pk' if ids else 'username'
+        known = dict(User.objects.filter(**{
+            f'{field}__in': {value for row in rows for value in row},
+        }).values_list(field, 'pk'))
+        return [(known[user], known[author]) for user, author in rows
+                if user in known and author in known]
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from posts.counters import count_of
+from posts.models import Comment, Follow, Post, PostStats, UserStats
+
+User = get_user_model()
+
+
+USER_COUNTERS = {
+    'posts_count': (Post.objects.all(), 'author_id'),
+    'comments_count': (Comment.objects.all(), 'author_id'),
+    'followers_count': (Follow.objects.all(), 'author_id'),
+    'following_count': (Follow.objects.all(), 'user_id'),
+}
+POST_COUNTERS = {
+    'comments_count': (Comment.objects.all(), 'post_id'),
+}
+
+
+class Command(BaseCommand):
+    help = 'Recount UserStats and PostStats rows that drifted from reality.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        fixed, missing = self.reconcile(User, UserStats, 'user_id',
+                                        USER_COUNTERS, batch_size, dry_run)
+        self.stdout.write(f'user stats: {fixed} rows out of sync, '
+                          f'{missing} missing')
+        fixed, missing = self.reconcile(Post, PostStats, 'post_id',
+                                        POST_COUNTERS, batch_size, dry_run)
+        self.stdout.write(f'post stats: {fixed} rows out of sync, '
+                          f'{missing} missing')
+
+    def reconcile(self, owner, stats, key, counters, batch_size, dry_run):
+        """Return how many existing rows drifted and how many were
+        missing; without ``dry_run`` both are repaired."""
+        real = {
+            name: count_of(queryset, field)
+            for name, (queryset, field) in counters.items()
+        }
+        fixed = missing = 0
+        last_pk = 0
+        while True:
+            ids = list(owner.objects.filter(pk__gt=last_pk).order_by(
+                'pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return fixed, missing
+            last_pk = ids[-1]
+            with transaction.atomic():
+                missing += len(ids) - stats.objects.filter(
+                    pk__in=ids).count()
+                if not dry_run:
+                    stats.objects.bulk_create(
+                        (stats(**{key: pk}) for pk in ids),
+                        ignore_conflicts=True,
+                    )
+                drifted = stats.objects.filter(pk__in=ids).annotate(
+                    **{f'real_{name}': expr for name, expr in real.items()}
+                ).exclude(
+                    **{name: F(f'real_{name}') for name in counters}
+                ).values_list('pk', flat=True)
+                drifted = list(drifted)
+                fixed += len(drifted)
+                if drifted and not dry_run:
+                    stats.objects.filter(pk__in=drifted).update(**real)
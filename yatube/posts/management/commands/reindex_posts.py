@@ -0,0 +1,141 @@
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import search
+from posts.models import Comment, Group, Post, SearchEntry
+
+# Группы меньше всего и без даты изменения, их индексируем целиком
+SOURCES = (
+    (SearchEntry.GROUP, Group, ('id', 'title', 'description'), None),
+    (SearchEntry.POST, Post, ('id', 'text'), 'updated'),
+    (SearchEntry.COMMENT, Comment, ('id', 'post_id', 'text'), 'updated'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the search index in streamed batches, fully or only '
+            'for posts and comments changed since a moment.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='0 tokenizes in the current process')
+        parser.add_argument('--since',
+                            help='ISO datetime, or "last" for the start of '
+                                 'the last finished run in --checkpoint')
+        parser.add_argument('--checkpoint',
+                            help='JSON file with progress; an unfinished '
+                                 'run recorded there is resumed')
+
+    def handle(self, *args, **options):
+        self.checkpoint = options['checkpoint']
+        state = self.load_state()
+        if state.get('done') is None:
+            state = {
+                'started': timezone.now().isoformat(),
+                'since': self.parse_since(options['since'], state),
+                'done': {},
+                'last_run': state.get('last_run'),
+            }
+        else:
+            self.stdout.write(f'Resuming run started {state["started"]}')
+        since = state['since'] and parse_datetime(state['since'])
+
+        workers = options['workers']
+        # При spawn и forkserver процесс начинает с чистого интерпретатора,
+        # и без django.setup() импорт posts.search упадёт
+        executor = ProcessPoolExecutor(
+            workers, initializer=django.setup) if workers else None
+        try:
+            for kind, model, fields, updated in SOURCES:
+                queryset = model.objects.filter(
+                    pk__gt=state['done'].get(kind, 0)).only(*fields)
+                if since and updated:
+                    queryset = queryset.filter(**{f'{updated}__gte': since})
+                total = self.index(kind, queryset, state, executor,
+                                   options['batch_size'], workers)
+                self.stdout.write(f'Indexed {total} {kind} entries')
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        if not since:
+            self.prune()
+        self.save_state({'last_run': state['started']})
+
+    def index(self, kind, queryset, state, executor, batch_size, workers):
+        rows = queryset.order_by('pk').iterator(chunk_size=batch_size)
+        running = deque()
+        total = 0
+
+        def write(instances, future):
+            bodies = future.result() if executor else future
+            search.replace(instances, bodies)
+            # Записываем пачки по порядку, чтобы отметка не обгоняла запись
+            state['done'][kind] = instances[-1].pk
+            self.save_state(state)
+            return len(instances)
+
+        for batch in batched(rows, batch_size):
+            texts = [search.searchable_text(instance) for instance in batch]
+            if executor is None:
+                total += write(batch, search.bodies(texts))
+                continue
+            # Не больше двух пачек на процесс в работе, остальное ждёт
+            if len(running) >= workers * 2:
+                total += write(*running.popleft())
+            running.append((batch, executor.submit(search.bodies, texts)))
+        while running:
+            total += write(*running.popleft())
+        return total
+
+    def prune(self):
+        """Drop entries whose objects were removed behind the signals."""
+        for kind, model, _, _ in SOURCES:
+            SearchEntry.objects.filter(kind=kind).exclude(
+                object_id__in=model.objects.values('pk')).delete()
+
+    def parse_since(self, value, state):
+        if not value:
+            return None
+        if value == 'last':
+            if not state.get('last_run'):
+                raise CommandError('No finished run in --checkpoint')
+            return state['last_run']
+        moment = parse_datetime(value)
+        if moment is None:
+            raise CommandError(f'Cannot parse --since {value!r}')
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment.isoformat()
+
+    def load_state(self):
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return {}
+        with open(self.checkpoint) as file:
+            return json.load(file)
+
+    def save_state(self, state):
+        if not self.checkpoint:
+            return
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(state, file)
+        os.replace(temporary, self.checkpoint)
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,171 @@
+import random
+from datetime import timedelta
+from io import StringIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    'кот собака утро город река лес дорога книга музыка кофе чай дождь '
+    'солнце море ветер поезд окно дом сад друг работа отпуск фильм '
+    'история вечер зима лето весна осень снег горы путь мечта'
+).split()
+PASSWORD = 'yatube-seed'
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with generated users, groups, posts, '
+            'comments and a power-law follow graph using bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='average number of authors per user')
+        parser.add_argument('--alpha', type=float, default=1.1,
+                            help='exponent of the popularity power law')
+        parser.add_argument('--days', type=int, default=365,
+                            help='spread of publication dates')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = f'seed{timezone.now():%Y%m%d%H%M%S}_'
+
+        user_ids = self.create_users(prefix, options['users'])
+        group_ids = self.create_groups(prefix, options['groups'])
+        # Популярность авторов распределена по степенному закону: немногие
+        # пишут больше всех и собирают большую часть подписчиков
+        weights = list(accumulate(
+            1 / rank ** options['alpha']
+            for rank in range(1, len(user_ids) + 1)))
+        post_ids = self.create_posts(options['posts'], user_ids, group_ids,
+                                     weights, options['days'])
+        self.create_comments(options['comments'], user_ids, post_ids)
+        pairs = self.create_follows(options['follows'], user_ids, weights)
+
+        self.stdout.write('Rebuilding counters, timelines and search index')
+        call_command('reconcile_counters', stdout=StringIO())
+        for start in range(0, len(pairs), self.batch_size):
+            timeline.backfill_many(pairs[start:start + self.batch_size])
+        call_command('reindex_posts', workers=0, stdout=StringIO())
+        # Объекты созданы без сигналов, поколения фрагментов устарели
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(user_ids)} users, {len(group_ids)} groups, '
+            f'{len(post_ids)} posts, {options["comments"]} comments, '
+            f'{len(pairs)} follows; password "{PASSWORD}"'))
+
+    def words(self, low, high):
+        return ' '.join(self.random.choices(WORDS,
+                                            k=self.random.randint(low, high)))
+
+    def bulk(self, model, objects, keep=()):
+        """Insert in batches and return the new primary keys in order.
+
+        ``keep`` lists fields that ``pre_save`` would overwrite on insert
+        (``auto_now_add``); they are written back with ``bulk_update``.
+        """
+        ids = []
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                ids += self.insert(model, batch, keep)
+                batch = []
+        if batch:
+            ids += self.insert(model, batch, keep)
+        return ids
+
+    @staticmethod
+    def insert(model, batch, keep):
+        # SQLite не возвращает ключи из bulk_create; сидер пишет один,
+        # поэтому новые ключи - всё, что больше прежнего максимума
+        last = model.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        values = [[getattr(obj, field) for field in keep] for obj in batch]
+        model.objects.bulk_create(batch)
+        ids = list(model.objects.filter(pk__gt=last).order_by(
+            'pk').values_list('pk', flat=True))
+        if keep:
+            for obj, pk, kept in zip(batch, ids, values):
+                obj.pk = pk
+                for field, value in zip(keep, kept):
+                    setattr(obj, field, value)
+            model.objects.bulk_update(batch, keep)
+        return ids
+
+    def create_users(self, prefix, count):
+        password = make_password(PASSWORD)
+        users = (
+            User(username=f'{prefix}{i}', password=password,
+                 first_name=self.random.choice(WORDS).title(),
+                 last_name=self.random.choice(WORDS).title())
+            for i in range(count)
+        )
+        return self.bulk(User, users)
+
+    def create_groups(self, prefix, count):
+        groups = (
+            Group(title=self.words(1, 3).title(), slug=f'{prefix}{i}',
+                  description=self.words(5, 20))
+            for i in range(count)
+        )
+        return self.bulk(Group, groups)
+
+    def create_posts(self, count, user_ids, group_ids, weights, days):
+        now = timezone.now()
+        dates = sorted(
+            now - timedelta(seconds=self.random.randint(0, days * 86400))
+            for _ in range(count))
+        posts = (
+            Post(text=self.words(5, 60), pub_date=pub_date,
+                 author_id=self.random.choices(user_ids,
+                                               cum_weights=weights)[0],
+                 group_id=(self.random.choice(group_ids)
+                           if group_ids and self.random.random() < 0.6
+                           else None))
+            for pub_date in dates
+        )
+        return self.bulk(Post, posts, keep=('pub_date',))
+
+    def create_comments(self, count, user_ids, post_ids):
+        if not post_ids:
+            return
+        comments = (
+            Comment(post_id=self.random.choice(post_ids),
+                    author_id=self.random.choice(user_ids),
+                    text=self.words(2, 20))
+            for _ in range(count)
+        )
+        self.bulk(Comment, comments)
+
+    def create_follows(self, average, user_ids, weights):
+        pairs = set()
+        for user_id in user_ids:
+            # Число подписок тоже с тяжёлым хвостом, в среднем ``average``
+            wanted = min(int(self.random.expovariate(1 / average)),
+                         len(user_ids) - 1)
+            authors = self.random.choices(user_ids, cum_weights=weights,
+                                          k=wanted)
+            pairs.update((user_id, author_id) for author_id in authors
+                         if author_id != user_id)
+        pairs = sorted(pairs)
+        for start in range(0, len(pairs), self.batch_size):
+            Follow.objects.bulk_create(
+                (Follow(user_id=user_id, author_id=author_id)
+                 for user_id, author_id in
+                 pairs[start:start + self.batch_size]),
+                ignore_conflicts=True)
+        return pairs
@@ -0,0 +1,41 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Render missing post image renditions ahead of the first view.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='0 renders in the current thread')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        posts = Post.objects.exclude(image='').order_by('pk').only(
+            'id', 'image').iterator(chunk_size=options['chunk_size'])
+        missing = (
+            post for post in posts
+            if thumbnails.lookup(post.image) is None
+        )
+        rendered = 0
+        if not workers:
+            for post in missing:
+                thumbnails.render(post.image.name, post.id)
+                rendered += 1
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                running = set()
+                for post in missing:
+                    # Не держим в очереди больше задач, чем можно выполнить
+                    if len(running) >= workers * 2:
+                        _, running = wait(running,
+                                          return_when=FIRST_COMPLETED)
+                    running.add(executor.submit(
+                        thumbnails.render, post.image.name, post.id))
+                    rendered += 1
+        self.stdout.write(f'Rendered {rendered} thumbnails')
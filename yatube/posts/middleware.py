@@ -0,0 +1,93 @@
+"""Whole-page cache for anonymous visitors.
+
+Pages are stored under the request path and query string plus the site
+generation, which is bumped together with every other content generation,
+so any change makes all cached pages unreachable at once. Responses carry
+an ``ETag`` of the body and, as ``Last-Modified``, the time of the last
+generation bump (``versions.site_modified``), never older than the page
+content; matching conditional requests get 304 without rendering
+anything. Requests with a session cookie always reach the view, so
+logged-in users never see a shared page. A miss is rendered from the
+primary database even when replicas are configured: a lagging replica
+may not have the change that bumped the generation yet.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from core.media import OFFLOAD_HEADERS
+
+from . import versions
+
+PAGE_TIMEOUT = 60 * 10
+KEY_PREFIX = 'page'
+UNCACHEABLE = ('private', 'no-cache', 'no-store')
+
+
+class AnonymousPageCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', PAGE_TIMEOUT)
+
+    def __call__(self, request):
+        if not self.is_cacheable_request(request):
+            return self.get_response(request)
+        key = self.make_key(request)
+        entry = cache.get(key)
+        if entry is None:
+            # Страницу для кэша читаем из основной базы, а не из реплики
+            request.fills_page_cache = True
+            response = self.get_response(request)
+            if not self.is_cacheable_response(request, response):
+                return response
+            # Читается после поколения в ключе, поэтому не старше него
+            last_modified = versions.site_modified()
+            response['ETag'] = '"%s"' % hashlib.md5(
+                response.content).hexdigest()
+            response['Last-Modified'] = http_date(last_modified)
+            entry = (response.status_code, response.content,
+                     list(response.items()), last_modified)
+            cache.set(key, entry, self.timeout)
+            response['X-Page-Cache'] = 'miss'
+        else:
+            status, content, headers, last_modified = entry
+            response = HttpResponse(content, status=status)
+            for header, value in headers:
+                response[header] = value
+            response['X-Page-Cache'] = 'hit'
+        return get_conditional_response(
+            request, etag=response['ETag'], last_modified=last_modified,
+            response=response)
+
+    @staticmethod
+    def is_cacheable_request(request):
+        return (request.method in ('GET', 'HEAD')
+                and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+    @staticmethod
+    def is_cacheable_response(request, response):
+        # Страницы с CSRF-токеном или куками у каждого посетителя свои
+        cache_control = response.get('Cache-Control', '')
+        return (response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                # Пустое тело с указанием прокси отдать файл
+                and not any(response.has_header(header)
+                            for header in OFFLOAD_HEADERS)
+                and not request.META.get('CSRF_COOKIE_USED')
+                # Отстающая реплика под свежим поколением сайта
+                and not getattr(request, 'replica', None)
+                and not any(directive in cache_control
+                            for directive in UNCACHEABLE))
+
+    @staticmethod
+    def make_key(request):
+        (version,) = versions.get_versions(versions.SITE)
+        digest = hashlib.md5(
+            request.get_full_path().encode()).hexdigest()
+        return f'{KEY_PREFIX}:{version}:{digest}'
+
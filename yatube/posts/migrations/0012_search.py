@@ -0,0 +1,82 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Основы слов уже посчитаны приложением, движку остаётся только разбить
+# body по пробелам. Триггеры пропадут, если SQLite пересоздаст таблицу
+# posts_searchentry в будущей миграции, их придётся создать заново.
+SQLITE_INSTALL = [
+    """CREATE VIRTUAL TABLE posts_searchindex USING fts5(
+        body, content='posts_searchentry', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER posts_searchentry_ai AFTER INSERT ON posts_searchentry
+    BEGIN
+        INSERT INTO posts_searchindex(rowid, body) VALUES (new.id, new.body);
+    END""",
+    """CREATE TRIGGER posts_searchentry_ad AFTER DELETE ON posts_searchentry
+    BEGIN
+        INSERT INTO posts_searchindex(posts_searchindex, rowid, body)
+        VALUES ('delete', old.id, old.body);
+    END""",
+    """CREATE TRIGGER posts_searchentry_au AFTER UPDATE ON posts_searchentry
+    BEGIN
+        INSERT INTO posts_searchindex(posts_searchindex, rowid, body)
+        VALUES ('delete', old.id, old.body);
+        INSERT INTO posts_searchindex(rowid, body) VALUES (new.id, new.body);
+    END""",
+]
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS posts_searchentry_ai',
+    'DROP TRIGGER IF EXISTS posts_searchentry_ad',
+    'DROP TRIGGER IF EXISTS posts_searchentry_au',
+    'DROP TABLE IF EXISTS posts_searchindex',
+]
+POSTGRESQL_INSTALL = [
+    """CREATE INDEX posts_searchentry_body_gin ON posts_searchentry
+    USING gin (to_tsvector('simple', body))""",
+]
+POSTGRESQL_UNINSTALL = [
+    'DROP INDEX IF EXISTS posts_searchentry_body_gin',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Пост'), ('comment', 'Комментарий'), ('group', 'Группа')], max_length=7, verbose_name='Тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Объект')),
+                ('body', models.TextField(verbose_name='Основы слов')),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Group', verbose_name='Группа')),
+                ('post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'search entry',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_entry'),
+        ),
+        migrations.RunPython(
+            run({'sqlite': SQLITE_INSTALL,
+                 'postgresql': POSTGRESQL_INSTALL}),
+            run({'sqlite': SQLITE_UNINSTALL,
+                 'postgresql': POSTGRESQL_UNINSTALL}),
+        ),
+    ]
@@ -43,10 +43,20 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    updated = models.DateTimeField(auto_now=True, db_index=True,
+                                   verbose_name='Изменён')
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = "post"
+        indexes = [
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_date_idx'),
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_date_idx'),
+        ]
 
     def __str__(self):
         count_of_simbols = 15
@@ -65,6 +75,14 @@ class Comment(models.Model):
     text = models.TextField(verbose_name='Текст комментария',
                             help_text='Напишите комментарий')
     created = models.DateTimeField(auto_now_add=True, verbose_name='Дата')
+    updated = models.DateTimeField(auto_now=True, db_index=True,
+                                   verbose_name='Изменён')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -76,5 +94,100 @@ class Follow(models.Model):
                                related_name='following',
                                on_delete=models.CASCADE,
                                verbose_name='Автор')
-    models.UniqueConstraint(fields=['user', 'author'],
-                            name='unic_follow_record')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unic_follow_record'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Materialized home timeline: a post delivered to a follower."""
+    user = models.ForeignKey(User,
+                             related_name='timeline',
+                             on_delete=models.CASCADE,
+                             verbose_name='Читатель')
+    post = models.ForeignKey(Post,
+                             related_name='timeline_entries',
+                             on_delete=models.CASCADE,
+                             verbose_name='Пост')
+    pub_date = models.DateTimeField(verbose_name='Дата')
+
+    class Meta:
+        verbose_name = "timeline entry"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_date_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    """Denormalized per-user counters kept in sync by signals."""
+    user = models.OneToOneField(User,
+                                primary_key=True,
+                                related_name='stats',
+                                on_delete=models.CASCADE,
+                                verbose_name='Пользователь')
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = "user stats"
+
+
+class PostStats(models.Model):
+    """Denormalized per-post counters kept in sync by signals."""
+    post = models.OneToOneField(Post,
+                                primary_key=True,
+                                related_name='stats',
+                                on_delete=models.CASCADE,
+                                verbose_name='Пост')
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+
+    class Meta:
+        verbose_name = "post stats"
+
+
+class SearchEntry(models.Model):
+    """Stemmed text of a post, comment or group for the search index.
+
+    On SQLite the rows are the external content of an FTS5 table, on
+    PostgreSQL ``body`` is covered by a GIN ``tsvector`` index.
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    GROUP = 'group'
+    KINDS = (
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+        (GROUP, 'Группа'),
+    )
+    kind = models.CharField('Тип', max_length=7, choices=KINDS)
+    object_id = models.PositiveIntegerField('Объект')
+    post = models.ForeignKey(Post,
+                             blank=True,
+                             null=True,
+                             related_name='+',
+                             on_delete=models.CASCADE,
+                             verbose_name='Пост')
+    group = models.ForeignKey(Group,
+                              blank=True,
+                              null=True,
+                              related_name='+',
+                              on_delete=models.CASCADE,
+                              verbose_name='Группа')
+    body = models.TextField('Основы слов')
+
+    class Meta:
+        verbose_name = "search entry"
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'],
+                                    name='unique_search_entry'),
+        ]
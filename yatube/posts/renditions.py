@@ -0,0 +1,115 @@
+"""Responsive renditions of post images.
+
+Every image is cropped to the feed aspect ratio and saved at several
+widths in JPEG and in every modern format the installed Pillow can encode
+(WebP, AVIF). Files live under deterministic keys derived from the source
+name, and a small manifest describing them is kept in the cache and next
+to the files, so templates can emit ``<picture>``/``srcset`` markup
+without touching the images.
+"""
+import hashlib
+import json
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+WIDTHS = (480, 960, 1440)
+ASPECT = (960, 339)
+DEFAULT_WIDTH = 960
+# Порядок важен: браузер берёт первый поддерживаемый <source>
+FORMATS = (
+    ('AVIF', 'avif', 'image/avif', {'quality': 50}),
+    ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 4}),
+    ('JPEG', 'jpg', 'image/jpeg', {'quality': 85, 'optimize': True,
+                                   'progressive': True}),
+)
+PREFIX = 'renditions'
+CACHE_PREFIX = 'rendition'
+MISSING_TIMEOUT = 60 * 5
+
+
+def supported_formats():
+    Image.init()
+    return [fmt for fmt in FORMATS if fmt[0] in Image.SAVE]
+
+
+def base_key(name):
+    digest = hashlib.sha1(name.encode()).hexdigest()
+    return f'{PREFIX}/{digest[:2]}/{digest}'
+
+
+def rendition_key(name, width, extension):
+    return f'{base_key(name)}/{width}w.{extension}'
+
+
+def manifest_key(name):
+    return f'{base_key(name)}/manifest.json'
+
+
+def _cache_key(name):
+    return f'{CACHE_PREFIX}:{base_key(name)}'
+
+
+def lookup(name, storage=default_storage):
+    """Return the manifest of a rendered image, or None if not rendered."""
+    if not name:
+        return None
+    manifest = cache.get(_cache_key(name))
+    if manifest is None:
+        key = manifest_key(name)
+        if storage.exists(key):
+            with storage.open(key) as file:
+                manifest = json.loads(file.read())
+            cache.set(_cache_key(name), manifest, None)
+        else:
+            # Пустой манифест: не проверяем хранилище на каждом показе,
+            # render() перезапишет ключ, как только картинки будут готовы
+            manifest = {}
+            cache.set(_cache_key(name), manifest, MISSING_TIMEOUT)
+    return manifest or None
+
+
+def _save(storage, key, content):
+    if storage.exists(key):
+        storage.delete(key)
+    storage.save(key, ContentFile(content))
+
+
+def render(name, storage=default_storage):
+    """Decode the source once and write every width in every format."""
+    with storage.open(name) as file:
+        source = Image.open(file)
+        source = ImageOps.exif_transpose(source)
+        source = source.convert('RGB')
+    # Ширина по умолчанию нужна всегда, даже если её придётся растянуть
+    widths = sorted({w for w in WIDTHS if w <= source.width}
+                    | {DEFAULT_WIDTH})
+    sized = {
+        width: ImageOps.fit(
+            source, (width, round(width * ASPECT[1] / ASPECT[0])),
+            Image.LANCZOS)
+        for width in widths
+    }
+    # Сначала кодируем всё в память, чтобы запись в хранилище была короткой
+    files = {}
+    manifest = {'sources': []}
+    for pil_format, extension, mime, options in supported_formats():
+        srcset = []
+        for width, image in sized.items():
+            buffer = BytesIO()
+            image.save(buffer, pil_format, **options)
+            key = rendition_key(name, width, extension)
+            files[key] = buffer.getvalue()
+            srcset.append([key, width])
+        manifest['sources'].append({'type': mime, 'srcset': srcset})
+    manifest['default'] = rendition_key(name, DEFAULT_WIDTH, 'jpg')
+    manifest['width'], manifest['height'] = ASPECT
+    for key, content in files.items():
+        _save(storage, key, content)
+    # Манифест пишется последним: по нему судят, что все файлы на месте
+    _save(storage, manifest_key(name), json.dumps(manifest).encode())
+    cache.set(_cache_key(name), manifest, None)
+    return manifest
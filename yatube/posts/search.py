@@ -0,0 +1,228 @@
+"""Full-text search over posts, comments and groups.
+
+Texts are split into words and reduced to Snowball stems (Russian for
+Cyrillic words, English for the rest) before they reach the database, so
+every backend indexes the same stems: an FTS5 table on SQLite, a GIN
+``tsvector`` index on PostgreSQL and a plain scan anywhere else. Hits are
+ranked by BM25 / ``ts_rank`` and paginated by a signed ``(score, id)``
+cursor, lower scores first.
+"""
+import re
+import threading
+from functools import lru_cache
+
+import snowballstemmer
+from django.core.paginator import Paginator
+from django.db import connections, router, transaction
+from django.db.models import FloatField, Value
+
+from .models import Comment, Group, Post, SearchEntry
+from .utills import BACKWARD, FORWARD, CursorPaginator
+
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+MAX_WORD_LENGTH = 40
+MAX_TERMS = 8
+MAX_QUERY_LENGTH = 200
+STEM_CACHE_SIZE = 100_000
+FTS_TABLE = 'posts_searchindex'
+
+_stemmers = threading.local()
+
+
+def _stemmer(language):
+    # Стеммеры snowballstemmer хранят состояние, по одному на поток
+    stemmer = getattr(_stemmers, language, None)
+    if stemmer is None:
+        stemmer = snowballstemmer.stemmer(language)
+        setattr(_stemmers, language, stemmer)
+    return stemmer
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    # Словарь текстов невелик, а Snowball на чистом Python медленный
+    language = 'russian' if CYRILLIC_RE.search(word) else 'english'
+    return _stemmer(language).stemWord(word)
+
+
+def stems(text):
+    """Stems of the words of ``text`` in their original order."""
+    return [
+        stem(word) for word in WORD_RE.findall(text.lower().replace('ё', 'е'))
+        if len(word) <= MAX_WORD_LENGTH
+    ]
+
+
+def body(text):
+    return ' '.join(stems(text))
+
+
+def bodies(texts):
+    """Index bodies of a batch of texts; picklable for process pools."""
+    return [body(text) for text in texts]
+
+
+def searchable_text(instance):
+    if isinstance(instance, Group):
+        return f'{instance.title} {instance.description}'
+    return instance.text
+
+
+def terms(query):
+    """Distinct stems of a user query, at most ``MAX_TERMS`` of them."""
+    return list(dict.fromkeys(stems(query[:MAX_QUERY_LENGTH])))[:MAX_TERMS]
+
+
+def document(instance, text_body=None):
+    """``SearchEntry`` fields describing a post, comment or group.
+
+    ``text_body`` is the precomputed ``body(searchable_text(instance))``.
+    """
+    if text_body is None:
+        text_body = body(searchable_text(instance))
+    if isinstance(instance, Post):
+        return {'kind': SearchEntry.POST, 'object_id': instance.id,
+                'post_id': instance.id, 'group_id': None,
+                'body': text_body}
+    if isinstance(instance, Comment):
+        return {'kind': SearchEntry.COMMENT, 'object_id': instance.id,
+                'post_id': instance.post_id, 'group_id': None,
+                'body': text_body}
+    if isinstance(instance, Group):
+        return {'kind': SearchEntry.GROUP, 'object_id': instance.id,
+                'post_id': None, 'group_id': instance.id,
+                'body': text_body}
+    raise TypeError(f'{type(instance).__name__} is not searchable')
+
+
+def index(instance):
+    fields = document(instance)
+    SearchEntry.objects.update_or_create(
+        kind=fields.pop('kind'), object_id=fields.pop('object_id'),
+        defaults=fields)
+
+
+def unindex(kind, object_id):
+    SearchEntry.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def replace(instances, text_bodies):
+    """Rewrite entries of a batch of objects of one kind in bulk."""
+    documents = [
+        document(instance, text_body)
+        for instance, text_body in zip(instances, text_bodies)
+    ]
+    if not documents:
+        return
+    with transaction.atomic():
+        SearchEntry.objects.filter(
+            kind=documents[0]['kind'],
+            object_id__in=[doc['object_id'] for doc in documents],
+        ).delete()
+        SearchEntry.objects.bulk_create(
+            SearchEntry(**doc) for doc in documents)
+
+
+def matches_sql(connection, terms):
+    """SQL selecting ``id, score`` of the entries containing all terms."""
+    if connection.vendor == 'sqlite':
+        query = ' '.join(f'"{term}"' for term in terms)
+        return (f'SELECT rowid AS id, bm25({FTS_TABLE}) AS score '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [query])
+    if connection.vendor == 'postgresql':
+        return ("SELECT id, -ts_rank(to_tsvector('simple', body), query) "
+                "AS score FROM posts_searchentry, "
+                "to_tsquery('simple', %s) query "
+                "WHERE to_tsvector('simple', body) @@ query",
+                [' & '.join(terms)])
+    # Без полнотекстового индекса: просмотр таблицы, все совпадения равны
+    entries = SearchEntry.objects.all()
+    for term in terms:
+        entries = entries.filter(body__contains=term)
+    entries = entries.annotate(
+        score=Value(0.0, output_field=FloatField())).values('id', 'score')
+    return entries.query.sql_with_params()
+
+
+class SearchPaginator(CursorPaginator):
+    """Keyset pagination over ranked search hits."""
+    cursor_salt = 'posts.search.cursor'
+
+    def __init__(self, terms, per_page):
+        Paginator.__init__(self, SearchEntry.objects.none(), per_page)
+        self.terms = terms
+        self.keys = [('score', False), ('id', False)]
+        self._num_pages = 1
+
+    def dump_key(self, obj):
+        return [obj.score, obj.id]
+
+    def load_key(self, values):
+        score, pk = values
+        return [float(score), int(pk)]
+
+    def fetch(self, cursor):
+        if not cursor:
+            direction, values = FORWARD, None
+        else:
+            direction, values = self.decode_cursor(cursor)
+        db = router.db_for_read(SearchEntry)
+        connection = connections[db]
+        sql, params = matches_sql(connection, self.terms)
+        sql, params = f'SELECT id, score FROM ({sql}) hits', list(params)
+        order = 'ASC'
+        if values is not None:
+            compare = '>' if direction == FORWARD else '<'
+            sql += (f' WHERE score {compare} %s'
+                    f' OR (score = %s AND id {compare} %s)')
+            params += [values[0], values[0], values[1]]
+        if direction == BACKWARD:
+            order = 'DESC'
+        sql += f' ORDER BY score {order}, id {order} LIMIT %s'
+        params.append(self.per_page + 1)
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            scores = db_cursor.fetchall()
+
+        has_more = len(scores) > self.per_page
+        scores = scores[:self.per_page]
+        if direction == BACKWARD:
+            scores.reverse()
+        rows = self.load_hits(scores, db)
+        if direction == BACKWARD:
+            return rows, has_more, True
+        return rows, values is not None, has_more
+
+    @staticmethod
+    def load_hits(scores, db):
+        """Entries in ``scores`` order with their post, group or comment."""
+        entries = SearchEntry.objects.using(db).select_related(
+            'post__author', 'post__group', 'group').in_bulk(
+            [pk for pk, _ in scores])
+        comment_ids = [
+            entry.object_id for entry in entries.values()
+            if entry.kind == SearchEntry.COMMENT
+        ]
+        comments = Comment.objects.using(db).select_related(
+            'author').in_bulk(comment_ids) if comment_ids else {}
+        hits = []
+        for pk, score in scores:
+            entry = entries.get(pk)
+            if entry is None:
+                continue
+            entry.score = score
+            entry.comment = comments.get(entry.object_id) if (
+                entry.kind == SearchEntry.COMMENT) else None
+            hits.append(entry)
+        return hits
+
+
+def search_page(query, per_page, request=None):
+    """Page of hits for ``query`` or None if it has no searchable words."""
+    query_terms = terms(query)
+    if not query_terms:
+        return None
+    paginator = SearchPaginator(query_terms, per_page)
+    cursor = None if request is None else request.GET.get('cursor')
+    return paginator.get_page(cursor)
@@ -0,0 +1,114 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core import metrics
+
+from . import counters, follows, search, timeline, versions
+from .models import Comment, Follow, Group, Post, SearchEntry
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    instance._previous_group_id = None
+    if instance.pk is not None:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    versions.bump_post(instance, instance._previous_group_id)
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+        metrics.inc('yatube_posts_created_total')
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    versions.bump_post(instance)
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    versions.bump(versions.post_scope(instance.post_id))
+    if created:
+        counters.bump_post(instance.post_id, 'comments_count', 1)
+        counters.bump_user(instance.author_id, 'comments_count', 1)
+        metrics.inc('yatube_comments_created_total')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    versions.bump(versions.post_scope(instance.post_id))
+    counters.bump_post(instance.post_id, 'comments_count', -1)
+    counters.bump_user(instance.author_id, 'comments_count', -1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # Ссылка на группу выводится и в профилях авторов её постов
+    author_ids = Post.objects.filter(group_id=instance.id).values_list(
+        'author_id', flat=True).distinct()
+    versions.bump(
+        versions.GLOBAL,
+        versions.group_scope(instance.id),
+        *(versions.author_scope(author_id) for author_id in author_ids),
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Group)
+def searchable_saved(sender, instance, **kwargs):
+    search.index(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_unindexed(sender, instance, **kwargs):
+    # Записи постов и групп удаляются каскадом по внешним ключам
+    search.unindex(SearchEntry.COMMENT, instance.id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Вход на сайт обновляет только last_login, выводимые данные не меняются
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    # Имя автора выводится и на страницах групп с его постами
+    group_ids = Post.objects.filter(
+        author_id=instance.id, group__isnull=False).values_list(
+        'group_id', flat=True).distinct()
+    versions.bump(
+        versions.GLOBAL,
+        versions.author_scope(instance.id),
+        *(versions.group_scope(group_id) for group_id in group_ids),
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        # Число подписчиков выводится в профиле автора
+        versions.bump(versions.author_scope(instance.author_id))
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        follows.forget_followed([(instance.user_id, instance.author_id)])
+        metrics.inc('yatube_follows_created_total')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    versions.bump(versions.author_scope(instance.author_id))
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    timeline.backfill_if_light(instance.author_id)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+    timeline.prune(instance.user_id, instance.author_id)
+    follows.forget_followed([(instance.user_id, instance.author_id)])
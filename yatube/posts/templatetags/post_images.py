@@ -0,0 +1,41 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from core import timing
+
+from .. import thumbnails
+
+register = template.Library()
+
+SIZES = '(max-width: 992px) 100vw, 960px'
+
+
+def _srcset(candidates):
+    return ', '.join(
+        f'{default_storage.url(key)} {width}w' for key, width in candidates)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post):
+    """Responsive ``<picture>`` for the post image, or the original image
+    while the renditions are being rendered in the background."""
+    context = {'image': post.image}
+    if not post.image:
+        return context
+    with timing.timed('thumb'):
+        manifest = thumbnails.lookup(post.image)
+        if manifest is None:
+            thumbnails.enqueue(post.image, post.id)
+    if manifest is None:
+        return context
+    context.update({
+        'sources': [
+            {'type': source['type'], 'srcset': _srcset(source['srcset'])}
+            for source in manifest['sources']
+        ],
+        'src': default_storage.url(manifest['default']),
+        'width': manifest['width'],
+        'height': manifest['height'],
+        'sizes': SIZES,
+    })
+    return context
@@ -0,0 +1,55 @@
+from django.test import TestCase
+
+from .. import benchmarks
+from ..models import Follow, Group, Post, User
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        User.objects.create_user(username='stranger')
+        Follow.objects.create(user=reader, author=author)
+        group = Group.objects.create(title='Группа', slug='test',
+                                     description='Описание')
+        cls.post = Post.objects.create(text='Пост', author=author,
+                                       group=group)
+
+    def test_every_view_is_covered(self):
+        """Замеры есть для каждого представления posts и users."""
+        from posts.urls import urlpatterns as posts_urls
+        from users.urls import urlpatterns as users_urls
+        names = {case.name.split('[')[0] for case in benchmarks.cases()}
+        expected = {f'posts:{url.name}' for url in posts_urls} | {
+            f'users:{url.name}' for url in users_urls}
+        self.assertEqual(names, expected)
+
+    def test_run_collects_metrics_and_keeps_data(self):
+        """Замер собирает все метрики и не меняет данные."""
+        results = benchmarks.run(2, only=['posts:index', 'add_comment'])
+        self.assertEqual(set(results), {'posts:index', 'posts:index[user]',
+                                        'posts:add_comment'})
+        for metrics in results.values():
+            self.assertLessEqual(set(benchmarks.METRICS), set(metrics))
+        self.assertGreater(results['posts:index']['queries'], 0)
+        self.assertGreater(results['posts:index']['render_ms'], 0)
+        self.assertGreater(results['posts:index']['alloc_kib'], 0)
+        self.assertFalse(self.post.comments.exists())
+
+    def test_compare(self):
+        """Регрессия - рост сверх порога и шума или лишний запрос."""
+        baseline = {'view': {'queries': 3, 'query_ms': 1.0,
+                             'render_ms': 10.0, 'total_ms': 20.0,
+                             'alloc_kib': 100}}
+        within = {'view': {'queries': 3, 'query_ms': 1.9,
+                           'render_ms': 12.0, 'total_ms': 21.0,
+                           'alloc_kib': 150}}
+        self.assertEqual(benchmarks.compare(within, baseline, 0.25), [])
+        worse = {'view': {'queries': 4, 'query_ms': 1.0,
+                          'render_ms': 14.0, 'total_ms': 20.0,
+                          'alloc_kib': 100}}
+        regressions = benchmarks.compare(worse, baseline, 0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('view: queries 3 -> 4'))
+        self.assertEqual(benchmarks.compare(worse, {}, 0.25), [])
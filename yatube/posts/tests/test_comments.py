@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import views
+from ..models import Comment, Post, User
+
+
+@mock.patch.object(views, 'COMMENTS_PER_PAGE', 3)
+class CommentWindowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=cls.author,
+                                   text=f'Комментарий {i}')
+            for i in range(7)
+        ]
+        cls.url = reverse('posts:post_comments', args=[cls.post.id])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def texts(self, response):
+        return [comment.text for comment in response.context['comments']]
+
+    def test_detail_shows_first_window(self):
+        """На странице поста только первые комментарии, старые сверху."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id]))
+        self.assertEqual(self.texts(response),
+                         ['Комментарий 0', 'Комментарий 1', 'Комментарий 2'])
+        self.assertNotContains(response, 'Комментарий 3')
+        self.assertContains(response, 'data-comments-more')
+        self.assertContains(response, f'{self.url}?cursor=')
+
+    def test_fragments_follow_cursor(self):
+        """Окна по курсору идут подряд до последнего комментария."""
+        texts = []
+        url = self.url
+        while url:
+            response = self.client.get(url)
+            self.assertTemplateUsed(response, 'posts/includes/comments.html')
+            self.assertNotContains(response, '<html')
+            texts += self.texts(response)
+            page = response.context['comments']
+            url = page.has_next() and (
+                f'{self.url}?cursor={page.next_cursor}')
+        self.assertEqual(texts,
+                         [comment.text for comment in self.comments])
+
+    def test_json(self):
+        response = self.client.get(self.url, {'format': 'json'})
+        data = response.json()
+        self.assertEqual([item['text'] for item in data['comments']],
+                         ['Комментарий 0', 'Комментарий 1', 'Комментарий 2'])
+        self.assertEqual(data['comments'][0]['author'], 'author')
+        data = self.client.get(data['next']).json()
+        self.assertEqual(data['comments'][0]['text'], 'Комментарий 3')
+        data = self.client.get(data['next']).json()
+        self.assertEqual([item['text'] for item in data['comments']],
+                         ['Комментарий 6'])
+        self.assertIsNone(data['next'])
+
+    def test_bad_cursor_and_missing_post(self):
+        response = self.client.get(self.url, {'cursor': 'forged'})
+        self.assertEqual(self.texts(response)[0], 'Комментарий 0')
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.id + 1]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, PostStats, User, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        Post.objects.create(text='Пост 2', author=cls.author)
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ок')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        reader_stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(reader_stats.comments_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(
+            PostStats.objects.get(post=self.post).comments_count, 1)
+
+        Post.objects.get(pk=self.post.pk).delete()
+        Follow.objects.all().delete()
+        stats.refresh_from_db()
+        reader_stats.refresh_from_db()
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(reader_stats.comments_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+
+    def test_pages_run_no_aggregates(self):
+        """Профиль и страница поста не выполняют COUNT."""
+        urls = [
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(url)
+                self.assertEqual(response.context['post_count'], 2)
+                for query in queries:
+                    self.assertNotIn('COUNT(', query['sql'])
+
+    def test_reconcile_fixes_drift(self):
+        """reconcile_counters исправляет рассинхронизацию счётчиков."""
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        PostStats.objects.all().delete()
+        out = StringIO()
+        call_command('reconcile_counters', dry_run=True, stdout=out)
+        self.assertIn('user stats: 1 rows out of sync, 0 missing',
+                      out.getvalue())
+        self.assertIn('post stats: 0 rows out of sync, 2 missing',
+                      out.getvalue())
+        self.assertFalse(PostStats.objects.exists())
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 2)
+        self.assertEqual(
+            PostStats.objects.get(post=self.post).comments_count, 1)
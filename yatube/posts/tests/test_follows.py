@@ -0,0 +1,180 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import follows
+from ..counters import user_stats
+from ..models import Follow, Post, TimelineEntry, User
+
+URL_FOLLOW_BULK = reverse('posts:follow_bulk')
+
+
+class BulkFollowTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(3)]
+        cls.posts = [Post.objects.create(text='Пост', author=author)
+                     for author in cls.authors]
+
+    def setUp(self):
+        cache.clear()
+
+    def pairs(self):
+        return set(Follow.objects.values_list('user_id', 'author_id'))
+
+    def test_follow_many(self):
+        """Новые подписки создаются пачкой, старые и на себя пропускаются."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        user_stats(self.authors[1].id)
+        wanted = {(self.reader.id, author.id) for author in self.authors}
+        created = follows.follow_many(
+            wanted | {(self.reader.id, self.reader.id)})
+        self.assertEqual(created, wanted - {(self.reader.id,
+                                             self.authors[0].id)})
+        self.assertEqual(self.pairs(), wanted)
+        self.assertEqual(user_stats(self.reader.id).following_count, 3)
+        self.assertEqual(user_stats(self.authors[1].id).followers_count, 1)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(user=self.reader).values_list(
+                'post_id', flat=True)),
+            {post.id for post in self.posts})
+        self.assertEqual(follows.follow_many(wanted), set())
+
+    def test_unfollow_many(self):
+        """Отписка удаляет строки, ленту и поправляет счётчики."""
+        for author in self.authors:
+            Follow.objects.create(user=self.reader, author=author)
+        gone = {(self.reader.id, author.id) for author in self.authors[:2]}
+        self.assertEqual(follows.unfollow_many(
+            gone | {(self.authors[0].id, self.reader.id)}), gone)
+        self.assertEqual(self.pairs(), {(self.reader.id,
+                                          self.authors[2].id)})
+        self.assertEqual(user_stats(self.reader.id).following_count, 1)
+        self.assertEqual(user_stats(self.authors[0].id).followers_count, 0)
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.reader).values_list(
+                'post_id', flat=True)), [self.posts[2].id])
+
+    def test_endpoint(self):
+        """Одним запросом можно подписаться и отписаться от многих."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        client = Client()
+        client.force_login(self.reader)
+        response = client.post(URL_FOLLOW_BULK, {
+            'follow': ['author1', 'author2', 'nobody'],
+            'unfollow': ['author0'],
+        })
+        self.assertEqual(response.json(), {
+            'followed': ['author1', 'author2'],
+            'unfollowed': ['author0'],
+            'unknown': ['nobody'],
+        })
+        self.assertEqual(self.pairs(), {(self.reader.id, author.id)
+                                        for author in self.authors[1:]})
+        self.assertEqual(client.get(URL_FOLLOW_BULK).status_code, 405)
+        response = Client().post(URL_FOLLOW_BULK, {'follow': ['author1']})
+        self.assertEqual(response.status_code, 302)
+
+    def test_import_follows_command(self):
+        """Команда import_follows читает пары имён из CSV."""
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as file:
+            file.write('user,author\nreader,author0\nreader,author1\n'
+                       'author0,author1\nreader,ghost\n')
+        out = StringIO()
+        call_command('import_follows', path, batch_size=2, stdout=out)
+        self.assertIn('3 follows created, 2 rows skipped', out.getvalue())
+        self.assertEqual(len(self.pairs()), 3)
+        self.assertEqual(user_stats(self.authors[1].id).followers_count, 2)
+
+        call_command('import_follows', path, unfollow=True, stdout=out)
+        self.assertFalse(Follow.objects.exists())
+
+
+
+@mock.patch.object(follows, 'can_return', lambda connection: False)
+class BulkFollowRowCountTests(BulkFollowTests):
+    """SQLite без RETURNING: по запросу на пару и число строк."""
+
+
+class FollowedIdsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(4)]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_cached_set_is_dropped_on_change(self):
+        """Множество читается один раз и сбрасывается подписками."""
+        Follow.objects.create(user=self.reader, author=self.authors[2])
+        self.assertEqual(list(follows.followed_ids(self.reader.id)),
+                         [self.authors[2].id])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIn(self.authors[2].id,
+                          follows.followed_ids(self.reader.id))
+        self.assertEqual(len(queries), 0)
+
+        for change in (
+            lambda: self.client.get(reverse('posts:profile_follow',
+                                            args=['author0'])),
+            lambda: follows.follow_many([(self.reader.id,
+                                          self.authors[3].id)]),
+            lambda: Follow.objects.filter(author=self.authors[2]).delete(),
+        ):
+            follows.followed_ids(self.reader.id)
+            change()
+            with CaptureQueriesContext(connection) as queries:
+                followed = follows.followed_ids(self.reader.id)
+            self.assertEqual(len(queries), 1)
+        self.assertEqual(list(followed), [self.authors[0].id,
+                                          self.authors[3].id])
+        self.assertNotIn(self.authors[1].id, followed)
+        self.assertEqual(len(follows.followed_ids(None)), 0)
+
+    def test_profile_button(self):
+        """Кнопка в профиле берётся из закэшированного множества."""
+        url = reverse('posts:profile', args=['author1'])
+        self.assertFalse(self.client.get(url).context['following'])
+        self.client.get(reverse('posts:profile_follow', args=['author1']))
+        self.assertTrue(self.client.get(url).context['following'])
+        self.client.get(reverse('posts:profile_unfollow', args=['author1']))
+        self.assertFalse(self.client.get(url).context['following'])
+
+    def test_post_detail_badge(self):
+        post = Post.objects.create(text='Пост', author=self.authors[0])
+        url = reverse('posts:post_detail', args=[post.id])
+        self.assertNotContains(self.client.get(url), 'вы подписаны')
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        self.assertContains(self.client.get(url), 'вы подписаны')
+
+
+class FollowedIdsCommitTests(TransactionTestCase):
+    def test_set_loaded_before_commit_is_dropped(self):
+        """Множество, прочитанное параллельно до коммита, сбрасывается
+        после коммита."""
+        cache.clear()
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        with transaction.atomic():
+            Follow.objects.create(user=reader, author=author)
+            # Другой процесс ещё видит базу без подписки
+            cache.set(follows._cache_key(reader.id), b'',
+                      follows.CACHE_TIMEOUT)
+            self.assertNotIn(author.id, follows.followed_ids(reader.id))
+        self.assertIn(author.id, follows.followed_ids(reader.id))
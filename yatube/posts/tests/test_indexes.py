@@ -0,0 +1,80 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса в формате SQLite')
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='test',
+                                         description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                text=f'Пост {i}', author=cls.author,
+                group=cls.group if i % 2 else None)
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'Комментарий {i}')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plans(self, url, table):
+        """Планы всех запросов страницы ``url`` к таблице ``table``."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if f'FROM "{table}"' not in query['sql']:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append(' '.join(row[-1] for row in cursor.fetchall()))
+        return plans
+
+    def assertUsesIndex(self, url, table, index):
+        plans = self.plans(url, table)
+        self.assertTrue(plans, f'Нет запросов к {table} на {url}')
+        self.assertTrue(any(index in plan for plan in plans), plans)
+        for plan in plans:
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_listing_indexes(self):
+        """Ленты читаются по составным индексам без сортировки."""
+        cases = (
+            (reverse('posts:index'), 'posts_post', 'post_date_idx'),
+            (reverse('posts:profile', args=[self.author.username]),
+             'posts_post', 'post_author_date_idx'),
+            (reverse('posts:group_list', args=[self.group.slug]),
+             'posts_post', 'post_group_date_idx'),
+            (reverse('posts:follow_index'),
+             'posts_timelineentry', 'timeline_user_date_idx'),
+            (reverse('posts:post_comments', args=[self.post.id]),
+             'posts_comment', 'comment_post_created_idx'),
+        )
+        for url, table, index in cases:
+            with self.subTest(url=url):
+                self.assertUsesIndex(url, table, index)
+
+    def test_follow_lookup_uses_unique_index(self):
+        """Подписки читателя читаются по уникальному индексу (user, author)."""
+        cache.clear()
+        plans = self.plans(
+            reverse('posts:profile', args=[self.author.username]),
+            'posts_follow')
+        self.assertTrue(plans)
+        for plan in plans:
+            self.assertIn('INDEX', plan)
+            self.assertIn('(user_id=?)', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from .. import follows
+from ..models import Follow, Post, User
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Первый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.url = reverse('posts:index')
+
+    def test_second_request_is_served_from_cache(self):
+        """Повторный запрос гостя не доходит до базы."""
+        first = self.guest_client.get(self.url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(self.url)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_content_change_invalidates_pages(self):
+        """Новый пост сразу виден в кэшированной ленте."""
+        self.guest_client.get(self.url)
+        Post.objects.create(text='Свежий пост', author=self.author)
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Свежий пост')
+
+    def test_last_modified_is_time_of_change(self):
+        """Last-Modified - время последнего изменения, а не сохранения
+        страницы: у разных страниц оно одно и не отстаёт от правки."""
+        with mock.patch('time.time', return_value=1_000_000_000):
+            Post.objects.create(text='Свежий пост', author=self.author)
+        with mock.patch('time.time', return_value=2_000_000_000):
+            response = self.guest_client.get(self.url)
+            other = self.guest_client.get(
+                reverse('posts:profile', args=[self.author.username]))
+        self.assertEqual(response['Last-Modified'], http_date(1_000_000_000))
+        self.assertEqual(other['Last-Modified'], response['Last-Modified'])
+        response = self.guest_client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=http_date(999_999_999))
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_string_is_part_of_key(self):
+        """Разные параметры запроса кэшируются отдельно."""
+        self.guest_client.get(self.url)
+        response = self.guest_client.get(self.url, {'page': 1})
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+
+    def test_conditional_requests(self):
+        """Совпадающие ETag и Last-Modified дают 304 без тела."""
+        response = self.guest_client.get(self.url)
+        not_modified = self.guest_client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        not_modified = self.guest_client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(not_modified.status_code, 304)
+        changed = self.guest_client.get(
+            self.url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(changed.status_code, 200)
+
+    def test_logged_in_users_bypass_cache(self):
+        """Авторизованные пользователи всегда получают свежую страницу."""
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(self.url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_follow_invalidates_profile(self):
+        """Подписка сразу меняет число подписчиков в кэшированном
+        профиле, в том числе массовая."""
+        url = reverse('posts:profile', args=[self.author.username])
+        reader = User.objects.create_user(username='reader')
+        self.assertContains(self.guest_client.get(url), 'Подписчиков: 0')
+        Follow.objects.create(user=reader, author=self.author)
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Подписчиков: 1')
+        follows.unfollow_many([(reader.id, self.author.id)])
+        self.assertContains(self.guest_client.get(url), 'Подписчиков: 0')
+        follows.follow_many([(reader.id, self.author.id)])
+        self.assertContains(self.guest_client.get(url), 'Подписчиков: 1')
+
+    def test_pages_with_csrf_token_are_not_cached(self):
+        """Страницы с формами и CSRF-токеном не кэшируются."""
+        url = reverse('users:login')
+        self.guest_client.get(url)
+        response = self.guest_client.get(url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
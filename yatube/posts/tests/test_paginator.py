@@ -0,0 +1,81 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, User
+from ..utills import CursorPaginator
+
+POSTS_COUNT = 23
+PER_PAGE = 10
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='HasNoName')
+        for i in range(POSTS_COUNT):
+            Post.objects.create(text=f'Тестовый текст {i}',
+                                author=cls.author)
+        cls.expected = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_walk_forward_and_back(self):
+        """Курсоры next/previous обходят все посты без пропусков."""
+        paginator = CursorPaginator(Post.objects.all(), PER_PAGE)
+        page = paginator.get_page(None)
+        pages = [list(page)]
+        while page.has_next():
+            page = CursorPaginator(Post.objects.all(), PER_PAGE).get_page(
+                page.next_cursor)
+            pages.append(list(page))
+        self.assertEqual([len(p) for p in pages], [10, 10, 3])
+        self.assertEqual(sum(pages, []), self.expected)
+
+        page = CursorPaginator(Post.objects.all(), PER_PAGE).get_page(
+            page.previous_cursor)
+        self.assertEqual(list(page), pages[1])
+        page = CursorPaginator(Post.objects.all(), PER_PAGE).get_page(
+            page.previous_cursor)
+        self.assertEqual(list(page), pages[0])
+        self.assertFalse(page.has_previous())
+
+    def test_no_count_query(self):
+        """Страница по курсору загружается одним запросом без COUNT."""
+        first = CursorPaginator(Post.objects.all(), PER_PAGE).get_page(None)
+        with CaptureQueriesContext(connection) as queries:
+            page = CursorPaginator(Post.objects.all(), PER_PAGE).get_page(
+                first.next_cursor)
+            page.has_other_pages()
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_forged_cursor_falls_back_to_first_page(self):
+        """Поддельный курсор отдаёт первую страницу."""
+        response = self.guest_client.get(
+            reverse('posts:index') + '?cursor=forged')
+        self.assertEqual(list(response.context['page_obj']),
+                         self.expected[:PER_PAGE])
+
+    def test_legacy_page_number(self):
+        """Старые ссылки ?page=N продолжают работать."""
+        response = self.guest_client.get(
+            reverse('posts:index') + '?page=3')
+        self.assertEqual(list(response.context['page_obj']),
+                         self.expected[2 * PER_PAGE:])
+
+    def test_next_link_in_template(self):
+        """Шаблон пагинатора выводит ссылку на следующую страницу."""
+        response = self.guest_client.get(reverse('posts:index'))
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, '?cursor=')
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': next_cursor})
+        self.assertEqual(list(response.context['page_obj']),
+                         self.expected[PER_PAGE:2 * PER_PAGE])
@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters
+from ..models import Comment, Follow, Group, Post, User
+
+POSTS_PER_PAGE = 10
+
+
+class QueryCountTests(TestCase):
+    """Число запросов каждой страницы не зависит от объёма данных."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='test',
+                                         description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(text='Пост', author=cls.author,
+                                       group=cls.group)
+        # Строки счётчиков создаются лениво, заводим их заранее
+        counters.post_stats(cls.post.id)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def grow(self):
+        """Добавляет полную страницу постов и комментариев от разных
+        пользователей, чтобы выявить запросы на каждую строку."""
+        for i in range(POSTS_PER_PAGE * 2):
+            user = User.objects.create_user(username=f'commenter{i}')
+            Post.objects.create(text=f'Пост {i}', author=self.author,
+                                group=self.group)
+            Comment.objects.create(post=self.post, author=user,
+                                   text=f'Комментарий {i}')
+
+    def count(self, client, url, method='get'):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            getattr(client, method)(url)
+        return len(queries)
+
+    def assertFlat(self, cases):
+        """Замеряет число запросов до и после роста данных."""
+        before = {name: self.count(*args) for name, args in cases.items()}
+        self.grow()
+        after = {name: self.count(*args) for name, args in cases.items()}
+        self.assertEqual(before, after)
+        return after
+
+    def test_read_views(self):
+        """Ленты и страница поста выполняют фиксированное число запросов."""
+        cases = {
+            'index': (self.reader_client, reverse('posts:index')),
+            'group_list': (self.reader_client,
+                           reverse('posts:group_list', args=['test'])),
+            'profile': (self.reader_client,
+                        reverse('posts:profile', args=['author'])),
+            'post_detail': (self.reader_client,
+                            reverse('posts:post_detail',
+                                    args=[self.post.id])),
+            'follow_index': (self.reader_client,
+                             reverse('posts:follow_index')),
+        }
+        counts = self.assertFlat(cases)
+        # сессия, пользователь, затем запросы самой страницы; на странице
+        # поста ещё подписки читателя, пока их нет в кэше
+        self.assertEqual(counts, {
+            'index': 3,
+            'group_list': 4,
+            'profile': 6,
+            'post_detail': 7,
+            'follow_index': 4,
+        })
+
+    def test_write_views(self):
+        """Формы и подписки выполняют фиксированное число запросов."""
+        post_url = reverse('posts:post_detail', args=[self.post.id])
+        cases = {
+            'post_create': (self.author_client,
+                            reverse('posts:post_create')),
+            'post_edit': (self.author_client,
+                          reverse('posts:post_edit', args=[self.post.id])),
+            'post_edit_foreign': (self.reader_client,
+                                  reverse('posts:post_edit',
+                                          args=[self.post.id])),
+            'add_comment': (self.reader_client,
+                            reverse('posts:add_comment',
+                                    args=[self.post.id]), 'post'),
+            'profile_unfollow': (self.reader_client,
+                                 reverse('posts:profile_unfollow',
+                                         args=['author'])),
+            'profile_follow': (self.reader_client,
+                               reverse('posts:profile_follow',
+                                       args=['author'])),
+        }
+        counts = self.assertFlat(cases)
+        self.assertEqual(counts['post_edit_foreign'],
+                         self.count(self.reader_client, post_url))
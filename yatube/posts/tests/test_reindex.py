@@ -0,0 +1,86 @@
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import partial
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..management.commands import reindex_posts
+from ..models import Comment, Group, Post, SearchEntry, User
+
+
+class ReindexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Кошки', slug='cats',
+                                         description='Про котов')
+        cls.posts = [
+            Post.objects.create(text=f'Кот номер {i}', author=cls.author)
+            for i in range(5)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Хороший кот')
+
+    def setUp(self):
+        # Индекс собирает команда, сигналы его не заполняли
+        SearchEntry.objects.all().delete()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = os.path.join(directory.name, 'reindex.json')
+
+    def reindex(self, workers=0, **options):
+        call_command('reindex_posts', workers=workers, batch_size=2,
+                     checkpoint=self.checkpoint, stdout=StringIO(),
+                     **options)
+
+    def entries(self):
+        return set(SearchEntry.objects.values_list('kind', 'object_id'))
+
+    def test_full_rebuild(self):
+        """Полная сборка индексирует всё и удаляет лишние записи."""
+        SearchEntry.objects.create(kind='comment', object_id=999,
+                                   body='лишн')
+        self.reindex()
+        expected = {('group', self.group.id), ('comment', self.comment.id)}
+        expected |= {('post', post.id) for post in self.posts}
+        self.assertEqual(self.entries(), expected)
+        with open(self.checkpoint) as file:
+            self.assertEqual(set(json.load(file)), {'last_run'})
+
+    def test_resume_from_checkpoint(self):
+        """Прерванная сборка продолжается с последней записанной пачки."""
+        with open(self.checkpoint, 'w') as file:
+            json.dump({'started': timezone.now().isoformat(), 'since': None,
+                       'done': {'group': self.group.id,
+                                'post': self.posts[2].id}}, file)
+        self.reindex()
+        self.assertEqual(self.entries(), {
+            ('post', self.posts[3].id), ('post', self.posts[4].id),
+            ('comment', self.comment.id),
+        })
+
+    def test_since(self):
+        """Режим --since берёт только изменённые посты и комментарии."""
+        Post.objects.filter(pk=self.posts[1].pk).update(
+            updated=timezone.now() + timedelta(hours=1))
+        self.reindex(since=(timezone.now()
+                            + timedelta(minutes=30)).isoformat())
+        self.assertEqual(self.entries(), {
+            ('group', self.group.id), ('post', self.posts[1].id)})
+
+    def test_spawned_workers(self):
+        """Процессы, запущенные через spawn, сами настраивают Django."""
+        spawn = partial(ProcessPoolExecutor,
+                        mp_context=multiprocessing.get_context('spawn'))
+        with mock.patch.object(reindex_posts, 'ProcessPoolExecutor', spawn):
+            self.reindex(workers=1)
+        self.assertEqual(len(self.entries()), 7)
@@ -0,0 +1,100 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Group, Post, SearchEntry, User
+
+POSTS_PER_PAGE = 10
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Кошки', slug='cats', description='Всё о домашних котах')
+        cls.post = Post.objects.create(
+            text='Наш кот любит спать на подоконнике', author=cls.author)
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.author, text='Собаки тоже любят подоконники')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse('posts:search')
+
+    def hits(self, query, cursor=None):
+        params = {'q': query}
+        if cursor:
+            params['cursor'] = cursor
+        response = self.guest_client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def found(self, query):
+        return {(hit.kind, hit.object_id) for hit in self.hits(query)}
+
+    def test_stems(self):
+        """Разные формы слова сводятся к одной основе."""
+        self.assertEqual(search.stems('Котами'), search.stems('кот'))
+        self.assertEqual(search.stems('ёжик'), search.stems('ежика'))
+
+    def test_finds_word_forms_everywhere(self):
+        """Поиск находит посты, комментарии и группы по формам слова."""
+        self.assertEqual(self.found('коты'), {
+            ('post', self.post.id), ('group', self.group.id)})
+        self.assertEqual(self.found('подоконник'), {
+            ('post', self.post.id), ('comment', self.comment.id)})
+        self.assertEqual(self.found('кот собака'), set())
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении записей."""
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Теперь про попугаев'
+        post.save()
+        self.assertEqual(self.found('попугай'), {('post', post.id)})
+        self.assertNotIn(('post', post.id), self.found('кот'))
+        Comment.objects.get(pk=self.comment.pk).delete()
+        self.assertEqual(self.found('собаки'), set())
+        post.delete()
+        self.assertEqual(self.found('попугай'), set())
+        self.assertFalse(SearchEntry.objects.filter(
+            kind='post', object_id=post.id).exists())
+
+    def test_ranking(self):
+        """Записи с большим числом совпадений выше в выдаче."""
+        best = Post.objects.create(
+            text='Кот, кот и ещё раз кот', author=self.author)
+        first = self.hits('кот')[0]
+        self.assertEqual((first.kind, first.object_id), ('post', best.id))
+
+    def test_keyset_pagination(self):
+        """Выдача листается курсором без повторов и пропусков."""
+        for i in range(POSTS_PER_PAGE + 5):
+            Post.objects.create(text=f'Сова номер {i}', author=self.author)
+        first = self.hits('совы')
+        self.assertEqual(len(first), POSTS_PER_PAGE)
+        self.assertTrue(first.has_next())
+        second = self.hits('совы', first.next_cursor)
+        self.assertEqual(len(second), 5)
+        self.assertFalse(second.has_next())
+        ids = [hit.id for hit in first] + [hit.id for hit in second]
+        self.assertEqual(len(set(ids)), POSTS_PER_PAGE + 5)
+        scores = [(hit.score, hit.id) for hit in first] + [
+            (hit.score, hit.id) for hit in second]
+        self.assertEqual(scores, sorted(scores))
+        back = self.hits('совы', second.previous_cursor)
+        self.assertEqual([hit.id for hit in back],
+                         [hit.id for hit in first])
+
+    def test_page_links_keep_query(self):
+        """Ссылки пагинатора сохраняют поисковый запрос."""
+        for i in range(POSTS_PER_PAGE + 1):
+            Post.objects.create(text=f'Сова {i}', author=self.author)
+        response = self.guest_client.get(self.url, {'q': 'сова'})
+        self.assertContains(response, '?q=%D1%81%D0%BE%D0%B2%D0%B0&amp;cursor=')
+
+    def test_empty_query(self):
+        """Пустой запрос показывает только форму поиска."""
+        response = self.guest_client.get(self.url, {'q': ' , '})
+        self.assertIsNone(response.context['page_obj'])
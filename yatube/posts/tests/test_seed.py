@@ -0,0 +1,47 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+
+from ..models import (Comment, Follow, Group, Post, SearchEntry,
+                      TimelineEntry, User, UserStats)
+
+
+class SeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('seed_yatube', users=60, groups=3, posts=300,
+                     comments=200, follows=8, batch_size=50,
+                     stdout=StringIO())
+
+    def test_volumes(self):
+        """Создаётся заказанное число объектов."""
+        self.assertEqual(User.objects.count(), 60)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 200)
+
+    def test_follow_graph_is_skewed(self):
+        """Подписчики сосредоточены у немногих популярных авторов."""
+        self.assertFalse(Follow.objects.filter(
+            user=F('author')).exists())
+        followers = sorted(Follow.objects.values('author_id').annotate(
+            total=Count('id')).values_list('total', flat=True),
+            reverse=True)
+        self.assertGreater(followers[0], 4 * followers[len(followers) // 2])
+
+    def test_publication_dates_are_spread(self):
+        """Даты публикации не совпадают с моментом вставки."""
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 250)
+
+    def test_derived_data_is_rebuilt(self):
+        """Счётчики, ленты и поисковый индекс собраны после вставки."""
+        author = User.objects.annotate(total=Count('posts')).order_by(
+            '-total').first()
+        self.assertEqual(UserStats.objects.get(user=author).posts_count,
+                         author.total)
+        self.assertTrue(TimelineEntry.objects.exists())
+        self.assertEqual(SearchEntry.objects.filter(kind='post').count(), 300)
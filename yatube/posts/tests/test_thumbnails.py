@@ -0,0 +1,118 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+from PIL import Image
+
+from .. import renditions, thumbnails
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.new('RGB', (1200, 800), 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile('big.jpg', buffer.getvalue(),
+                              content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        thumbnails.drain()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(text='Пост', author=self.author,
+                                        image=make_image())
+        self.url = reverse('posts:post_detail', args=[self.post.id])
+
+    def test_original_is_served_until_renditions_are_ready(self):
+        """Пока превью не готовы, страница показывает оригинал."""
+        self.assertIsNone(thumbnails.lookup(self.post.image))
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, self.post.image.url)
+
+        thumbnails.render(self.post.image.name, self.post.id)
+        manifest = thumbnails.lookup(self.post.image)
+        self.assertIsNotNone(manifest)
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, default_storage.url(
+            manifest['default']))
+        self.assertNotContains(response, self.post.image.url)
+
+    def test_renditions(self):
+        """Каждая ширина готова во всех форматах, что умеет Pillow."""
+        manifest = renditions.render(self.post.image.name)
+        types = [source['type'] for source in manifest['sources']]
+        expected = [mime for _, _, mime, _ in renditions.supported_formats()]
+        self.assertEqual(types, expected)
+        self.assertEqual(types[-1], 'image/jpeg')
+        for source in manifest['sources']:
+            widths = [width for _, width in source['srcset']]
+            self.assertEqual(widths, [480, 960])
+            for key, width in source['srcset']:
+                with default_storage.open(key) as file:
+                    image = Image.open(file)
+                    self.assertEqual(image.size,
+                                     (width, round(width * 339 / 960)))
+
+    def test_warm_thumbnails_command(self):
+        """Команда warm_thumbnails готовит превью для старых постов."""
+        call_command('warm_thumbnails', workers=0, stdout=StringIO())
+        self.assertIsNotNone(thumbnails.lookup(self.post.image))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailQueueTests(TransactionTestCase):
+    """Очередь запускается только после коммита, поэтому без TestCase."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def tearDown(self):
+        # Потоки пула не должны писать в каталог, который уже удалён
+        thumbnails.drain()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_create_and_edit_queue_renditions(self):
+        """Новая картинка отправляется в очередь сразу при сохранении,
+        правка без новой картинки очередь не трогает."""
+        with mock.patch.object(thumbnails, 'enqueue',
+                               wraps=thumbnails.enqueue) as enqueue:
+            self.client.post(reverse('posts:post_create'),
+                             {'text': 'Пост', 'image': make_image()})
+            post = Post.objects.get()
+            thumbnails.drain()
+            self.assertIsNotNone(thumbnails.lookup(post.image))
+            self.assertEqual(enqueue.call_count, 1)
+
+            url = reverse('posts:post_edit', args=[post.id])
+            self.client.post(url, {'text': 'Правка'})
+            self.assertEqual(enqueue.call_count, 1)
+            self.client.post(url, {'text': 'Правка', 'image': make_image()})
+            self.assertEqual(enqueue.call_count, 2)
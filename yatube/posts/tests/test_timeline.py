@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry, User
+
+URL_FOLLOW_INDEX = reverse('posts:follow_index')
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self, **params):
+        response = self.client.get(URL_FOLLOW_INDEX, params)
+        return response.context['page_obj']
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост автора попадает в ленты подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post, pub_date=post.pub_date).exists())
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.author).exists())
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка переносит старые посты в ленту, отписка их удаляет."""
+        posts = [Post.objects.create(text=f'Пост {i}', author=self.author)
+                 for i in range(3)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(list(self.feed()), posts[::-1])
+
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+        self.assertEqual(list(self.feed()), [])
+
+    @mock.patch.object(timeline, 'BACKFILL_POSTS', 2)
+    def test_backfill_many(self):
+        """Массовая подписка берёт последние посты всех авторов одним
+        запросом и пишет ленты одной вставкой."""
+        posts = {
+            author: [Post.objects.create(text=f'Пост {i}', author=author)
+                     for i in range(3)]
+            for author in (self.author, self.star)
+        }
+        pairs = [(self.reader.id, self.author.id),
+                 (self.reader.id, self.star.id),
+                 (self.star.id, self.author.id)]
+        expected = {
+            (user_id, post.id, post.pub_date)
+            for user_id, author_id in pairs
+            for post in posts[User(pk=author_id)][1:]
+        }
+        for over_clause in (True, False):
+            with self.subTest(over_clause=over_clause), mock.patch.object(
+                    connection.features, 'supports_over_clause',
+                    over_clause):
+                TimelineEntry.objects.all().delete()
+                with self.assertNumQueries(3 if over_clause else 4):
+                    timeline.backfill_many(pairs)
+                self.assertEqual(set(TimelineEntry.objects.values_list(
+                    'user_id', 'post_id', 'pub_date')), expected)
+
+    @mock.patch.object(timeline, 'FANOUT_FOLLOWERS_LIMIT', 1)
+    def test_heavy_author_is_merged_on_read(self):
+        """Посты популярного автора подмешиваются в ленту при чтении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.author, author=self.star)
+        posts = []
+        for i in range(12):
+            author = self.star if i % 2 else self.author
+            posts.append(Post.objects.create(text=f'Пост {i}', author=author))
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__author=self.star).exists())
+        self.assertTrue(TimelineEntry.objects.filter(
+            post__author=self.author).exists())
+
+        expected = posts[::-1]
+        first = self.feed()
+        self.assertEqual(list(first), expected[:10])
+        second = self.feed(cursor=first.next_cursor)
+        self.assertEqual(list(second), expected[10:])
+        self.assertFalse(second.has_next())
+        back = self.feed(cursor=second.previous_cursor)
+        self.assertEqual(list(back), expected[:10])
+        self.assertEqual(list(self.feed(page=2)), expected[10:])
+
+    @mock.patch.object(timeline, 'FANOUT_FOLLOWERS_LIMIT', 1)
+    def test_author_crossing_the_limit(self):
+        """Автор, ставший популярным и обратно, не дублируется и не
+        пропадает из ленты."""
+        Follow.objects.create(user=self.reader, author=self.star)
+        before = Post.objects.create(text='До', author=self.star)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=before).exists())
+
+        Follow.objects.create(user=self.author, author=self.star)
+        during = Post.objects.create(text='Во время', author=self.star)
+        self.assertFalse(TimelineEntry.objects.filter(post=during).exists())
+        self.assertEqual(list(self.feed()), [during, before])
+
+        Follow.objects.filter(user=self.author, author=self.star).delete()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=during).exists())
+        self.assertEqual(list(self.feed()), [during, before])
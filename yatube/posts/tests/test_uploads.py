@@ -0,0 +1,71 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from ..forms import PostForm
+
+ORIENTATION = 0x0112
+
+
+def make_upload(size=(400, 200), mode='RGB', fmt='JPEG', name='photo.jpg',
+                **options):
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, fmt, **options)
+    return SimpleUploadedFile(name, buffer.getvalue(),
+                              content_type=f'image/{fmt.lower()}')
+
+
+@override_settings(POST_IMAGE_MAX_BYTES=200_000,
+                   POST_IMAGE_MAX_PIXELS=4_000_000,
+                   POST_IMAGE_MAX_SIDE=1000)
+class UploadTests(TestCase):
+    def clean(self, upload):
+        form = PostForm(data={'text': 'Пост'}, files={'image': upload})
+        return form, form.is_valid()
+
+    def open(self, form):
+        image = form.cleaned_data['image']
+        image.seek(0)
+        return Image.open(image)
+
+    def test_exif_orientation_applied_and_stripped(self):
+        """Поворот из EXIF применяется, а метаданные удаляются."""
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        form, valid = self.clean(make_upload(exif=exif.tobytes()))
+        self.assertTrue(valid, form.errors)
+        image = self.open(form)
+        self.assertEqual(image.size, (200, 400))
+        self.assertNotIn(ORIENTATION, image.getexif())
+        self.assertNotIn('exif', image.info)
+
+    def test_downscaled_to_master_size(self):
+        """Большая картинка уменьшается до предельной стороны."""
+        form, valid = self.clean(make_upload(size=(1800, 900)))
+        self.assertTrue(valid, form.errors)
+        self.assertEqual(self.open(form).size, (1000, 500))
+
+    def test_transparency_kept_as_png(self):
+        """Картинка с прозрачностью сохраняется в PNG."""
+        form, valid = self.clean(make_upload(
+            mode='RGBA', fmt='PNG', name='logo.png'))
+        self.assertTrue(valid, form.errors)
+        self.assertEqual(form.cleaned_data['image'].name, 'logo.png')
+        self.assertEqual(self.open(form).format, 'PNG')
+
+    def test_too_many_pixels_rejected(self):
+        """Картинка с лишними мегапикселями не проходит проверку."""
+        form, valid = self.clean(make_upload(size=(4000, 1200)))
+        self.assertFalse(valid)
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'too_many_pixels')
+
+    @override_settings(POST_IMAGE_MAX_BYTES=100)
+    def test_too_large_file_rejected(self):
+        """Слишком большой файл не проходит проверку."""
+        form, valid = self.clean(make_upload())
+        self.assertFalse(valid)
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'file_too_large')
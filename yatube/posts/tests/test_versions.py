@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+
+
+class VersionedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='first',
+                                         description='Описание')
+        cls.other_group = Group.objects.create(title='Группа 2',
+                                               slug='second',
+                                               description='Описание')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(text='Исходный текст',
+                                        author=self.author, group=self.group)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=[self.group.slug]),
+            'profile': reverse('posts:profile', args=[self.author.username]),
+            'detail': reverse('posts:post_detail', args=[self.post.id]),
+        }
+
+    def test_fragments_are_cached(self):
+        """Без изменений через ORM-сигналы страницы отдаются из кэша."""
+        for url in self.urls.values():
+            self.guest_client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Исходный текст')
+
+    def test_post_edit_invalidates_pages(self):
+        """Правка поста сразу видна на всех страницах."""
+        for url in self.urls.values():
+            self.guest_client.get(url)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Новый текст')
+
+    def test_group_change_invalidates_old_group(self):
+        """Перенос поста в другую группу убирает его со старой страницы."""
+        self.guest_client.get(self.urls['group'])
+        self.post.group = self.other_group
+        self.post.save()
+        response = self.guest_client.get(self.urls['group'])
+        self.assertNotContains(response, 'Исходный текст')
+
+    def test_comment_invalidates_detail(self):
+        """Новый комментарий сразу виден на странице поста."""
+        self.guest_client.get(self.urls['detail'])
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Свежий комментарий')
+        response = self.guest_client.get(self.urls['detail'])
+        self.assertContains(response, 'Свежий комментарий')
+
+    def test_author_rename_invalidates_pages(self):
+        """Новое имя автора сразу видно в лентах с его постами, в том числе
+        на странице группы."""
+        feeds = {name: self.urls[name] for name in ('index', 'group')}
+        for url in feeds.values():
+            self.guest_client.get(url)
+        self.author.first_name = 'Лев'
+        self.author.last_name = 'Толстой'
+        self.author.save()
+        for name, url in feeds.items():
+            with self.subTest(page=name):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Лев Толстой')
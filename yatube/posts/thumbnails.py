@@ -0,0 +1,96 @@
+"""Post image renditions rendered off the request path.
+
+Views only look the rendition manifest up; missing renditions are queued
+on a small thread pool and the page shows the original image until they
+exist. When they are ready the post's cache generations are bumped so
+cached fragments switch to the responsive markup.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from core import metrics
+
+from . import renditions, versions
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def drain():
+    """Wait for the queued renders; the next ``enqueue`` starts a new
+    pool. Tests call it before removing their media directory."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def lookup(image):
+    """Return the rendition manifest of ``image`` or None without
+    rendering anything."""
+    if not image:
+        return None
+    return renditions.lookup(image.name)
+
+
+def render(name, post_id=None):
+    """Render renditions synchronously; used by workers and commands."""
+    start = time.perf_counter()
+    try:
+        renditions.render(name)
+        metrics.inc('yatube_thumbnails_total', result='rendered')
+        if post_id is not None:
+            bump_post(post_id)
+    except Exception:
+        metrics.inc('yatube_thumbnails_total', result='failed')
+        logger.exception('Renditions for %s failed', name)
+    finally:
+        metrics.inc('yatube_thumbnail_seconds_total',
+                    time.perf_counter() - start)
+        with _lock:
+            _pending.discard(name)
+        close_old_connections()
+
+
+def bump_post(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'id', 'author_id', 'group_id').first()
+    if post is not None:
+        versions.bump_post(post)
+
+
+def _submit(name, post_id):
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    metrics.inc('yatube_thumbnails_total', result='queued')
+    get_executor().submit(render, name, post_id)
+
+
+def enqueue(image, post_id=None):
+    """Queue rendering of ``image`` once the current transaction commits."""
+    if image:
+        name = image.name
+        transaction.on_commit(lambda: _submit(name, post_id))
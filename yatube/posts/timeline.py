@@ -0,0 +1,193 @@
+"""Fan-out-on-write home timeline for ``follow_index``.
+
+New posts are copied into ``TimelineEntry`` rows of every follower, so the
+feed is a range scan over one user's entries. Authors with more than
+``FANOUT_FOLLOWERS_LIMIT`` followers (as counted in ``UserStats``) are not
+fanned out: their posts are merged into the feed on read instead, which
+keeps publishing bounded. While an author is heavy their entries are
+ignored on read, so every author has exactly one source in the feed; when
+they drop back under the limit their followers are backfilled.
+"""
+from django.db import connections, router
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .utills import BACKWARD, FORWARD, CursorPaginator, paginator_add
+
+FANOUT_FOLLOWERS_LIMIT = 1000
+BACKFILL_POSTS = 200
+BATCH_SIZE = 500
+TIMELINE_ORDERING = ('-pub_date', '-post_id')
+
+
+def is_heavy(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count__gt=FANOUT_FOLLOWERS_LIMIT
+    ).exists()
+
+
+def heavy_author_ids(user):
+    return list(Follow.objects.filter(
+        user_id=user.id,
+        author__stats__followers_count__gt=FANOUT_FOLLOWERS_LIMIT,
+    ).values_list('author_id', flat=True))
+
+
+def fan_out(post):
+    """Push a freshly created post into its author's followers' timelines."""
+    if is_heavy(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post.id,
+                       pub_date=post.pub_date) for user_id in followers),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Copy the latest posts of a newly followed author into the feed."""
+    if is_heavy(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')[:BACKFILL_POSTS]
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def latest_posts(author_ids):
+    """``(id, author_id, pub_date)`` of the latest ``BACKFILL_POSTS`` posts
+    of every author, in one query numbering each author's posts."""
+    connection = connections[router.db_for_read(Post)]
+    if not connection.features.supports_over_clause:
+        # SQLite до 3.25 без оконных функций: запрос на автора
+        return [
+            (post_id, author_id, pub_date) for author_id in author_ids
+            for post_id, pub_date in Post.objects.filter(
+                author_id=author_id).order_by('-pub_date', '-id').values_list(
+                'id', 'pub_date')[:BACKFILL_POSTS]
+        ]
+    ranked = Post.objects.filter(author_id__in=author_ids).annotate(
+        recent=Window(RowNumber(), partition_by=[F('author_id')],
+                      order_by=[F('pub_date').desc(), F('id').desc()]),
+    ).values('id', 'author_id', 'pub_date', 'recent')
+    sql, params = ranked.query.get_compiler(
+        connection=connection).as_sql()
+    # Фильтр по оконной функции Django 2.2 строить не умеет
+    posts = Post.objects.using(connection.alias).raw(
+        f'SELECT id, author_id, pub_date FROM ({sql}) ranked '
+        f'WHERE recent <= %s', [*params, BACKFILL_POSTS])
+    return [(post.id, post.author_id, post.pub_date) for post in posts]
+
+
+def backfill_many(pairs):
+    """``backfill`` for many ``(user_id, author_id)`` follow pairs at once,
+    for follows created in bulk without signals: one query for the posts
+    of all authors and one ``bulk_create`` of the entries."""
+    followers = {}
+    for user_id, author_id in pairs:
+        followers.setdefault(author_id, []).append(user_id)
+    heavy = set(UserStats.objects.filter(
+        user_id__in=followers, followers_count__gt=FANOUT_FOLLOWERS_LIMIT
+    ).values_list('user_id', flat=True))
+    authors = sorted(set(followers) - heavy)
+    if not authors:
+        return
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, author_id, pub_date in latest_posts(authors)
+         for user_id in followers[author_id]),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_author(author_id):
+    """Backfill every follower of an author that is no longer heavy:
+    posts published while they were heavy have no entries yet."""
+    backfill_many(
+        (user_id, author_id) for user_id in Follow.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True))
+
+
+def backfill_if_light(author_id):
+    """Call after an unfollow: backfill if the author just dropped to the
+    limit and is fanned out again."""
+    if UserStats.objects.filter(
+            user_id=author_id,
+            followers_count=FANOUT_FOLLOWERS_LIMIT).exists():
+        backfill_author(author_id)
+
+
+def prune(user_id, author_id):
+    """Drop an unfollowed author's posts from the feed."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def prune_many(pairs):
+    """``prune`` for many ``(user_id, author_id)`` pairs: one ``DELETE``
+    per batch of readers."""
+    authors = {}
+    for user_id, author_id in pairs:
+        authors.setdefault(user_id, set()).add(author_id)
+    readers = sorted(authors)
+    for start in range(0, len(readers), BATCH_SIZE):
+        condition = Q()
+        for user_id in readers[start:start + BATCH_SIZE]:
+            condition |= Q(user_id=user_id,
+                           post__author_id__in=authors[user_id])
+        TimelineEntry.objects.filter(condition).delete()
+
+
+def timeline_page(user, per_page, request=None):
+    """Return a ``Page`` of posts for the home timeline of ``user``."""
+    params = {} if request is None else request.GET
+    heavy = heavy_author_ids(user)
+    if 'page' in params and 'cursor' not in params:
+        post_list = Post.objects.filter(
+            Q(timeline_entries__user_id=user.id) | Q(author_id__in=heavy)
+        ).select_related('author', 'group').distinct()
+        return paginator_add(post_list, per_page, request)
+
+    entries = TimelineEntry.objects.filter(user_id=user.id).select_related(
+        'post__author', 'post__group')
+    if heavy:
+        # Посты популярных авторов берутся только из pulled, даже если
+        # часть их уже лежит в ленте с тех пор, как автор был обычным
+        entries = entries.exclude(post__author_id__in=heavy)
+    entry_paginator = CursorPaginator(entries, per_page, TIMELINE_ORDERING)
+    cursor = entry_paginator.clean_cursor(params.get('cursor'))
+    if not heavy:
+        page = entry_paginator.page(cursor)
+        page.object_list = [entry.post for entry in page.object_list]
+        return page
+
+    rows, has_previous, has_next = entry_paginator.fetch(cursor)
+    posts = [entry.post for entry in rows]
+    pulled = Post.objects.filter(author_id__in=heavy).select_related(
+        'author', 'group')
+    paginator = CursorPaginator(pulled, per_page)
+    pulled_rows, pulled_previous, pulled_next = paginator.fetch(cursor)
+
+    unique = {post.id: post for post in posts + pulled_rows}
+    merged = sorted(unique.values(),
+                    key=lambda post: (post.pub_date, post.id), reverse=True)
+    overflow = len(merged) > per_page
+    direction = FORWARD
+    if cursor:
+        direction, _ = paginator.decode_cursor(cursor)
+    if direction == BACKWARD:
+        merged = merged[-per_page:]
+        has_previous = has_previous or pulled_previous or overflow
+    else:
+        merged = merged[:per_page]
+        has_next = has_next or pulled_next or overflow
+    return paginator.make_page(merged, cursor, has_previous, has_next)
@@ -0,0 +1,72 @@
+"""Normalization of uploaded post images.
+
+Django streams large uploads to a temporary file in chunks; here the
+upload is checked against byte and pixel limits before anything is
+decoded, rotated according to its EXIF orientation, downscaled to the
+master size and re-encoded without metadata into another temporary
+spooled file that spills to disk once it grows past a few megabytes.
+"""
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+MAX_BYTES = 10 * 1024 * 1024
+MAX_PIXELS = 40_000_000
+MAX_SIDE = 2560
+JPEG_OPTIONS = {'quality': 88, 'optimize': True, 'progressive': True}
+SPOOL_SIZE = 4 * 1024 * 1024
+
+
+def limits():
+    return (
+        getattr(settings, 'POST_IMAGE_MAX_BYTES', MAX_BYTES),
+        getattr(settings, 'POST_IMAGE_MAX_PIXELS', MAX_PIXELS),
+        getattr(settings, 'POST_IMAGE_MAX_SIDE', MAX_SIDE),
+    )
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+
+
+def normalize(upload):
+    """Return a re-encoded copy of ``upload`` or raise ValidationError."""
+    max_bytes, max_pixels, max_side = limits()
+    if upload.size > max_bytes:
+        raise ValidationError(
+            'Файл больше %(limit)s', code='file_too_large',
+            params={'limit': filesizeformat(max_bytes)})
+    upload.seek(0)
+    with Image.open(upload) as image:
+        # Размеры читаются из заголовка, до декодирования пикселей
+        width, height = image.size
+        if width * height > max_pixels:
+            raise ValidationError(
+                'Картинка больше %(limit)s мегапикселей',
+                code='too_many_pixels',
+                params={'limit': max_pixels // 1_000_000})
+        # JPEG умеет декодироваться сразу в уменьшенном масштабе
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        if has_alpha(image):
+            image = image.convert('RGBA')
+            pil_format, extension, options = 'PNG', 'png', {'optimize': True}
+        else:
+            image = image.convert('RGB')
+            pil_format, extension, options = 'JPEG', 'jpg', JPEG_OPTIONS
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    stem = os.path.splitext(os.path.basename(upload.name))[0] or 'image'
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    # Метаданные (EXIF, ICC, текстовые блоки) не переносятся
+    image.save(output, pil_format, **options)
+    result = File(output, name=f'{stem}.{extension}')
+    result.size = output.tell()
+    output.seek(0)
+    return result
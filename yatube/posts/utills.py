@@ -1,7 +1,142 @@
-from django.core.paginator import Paginator
+from django.core import signing
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+POST_ORDERING = ('-pub_date', '-id')
+CURSOR_SALT = 'posts.utills.cursor'
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class CursorPaginator(Paginator):
+    """Keyset paginator: pages are addressed by a signed cursor instead of
+    a page number, so neither COUNT(*) nor OFFSET is ever executed.
+
+    ``ordering`` is a tuple of model field names in ``order_by`` notation,
+    the last one must be unique (usually the primary key). One paginator
+    serves exactly one page: ``number`` and ``num_pages`` of the returned
+    page describe a window around it (1 or 2 and up to 3) so that
+    ``has_next``/``has_previous`` work without counting rows.
+    """
+    cursor_based = True
+    cursor_salt = CURSOR_SALT
+
+    def __init__(self, object_list, per_page, ordering=POST_ORDERING):
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.ordering = ordering
+        self.keys = [
+            (name.lstrip('-'), name.startswith('-')) for name in ordering
+        ]
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    def dump_key(self, obj):
+        """Serializable values of the ordering keys of ``obj``."""
+        return [
+            self._field(name).value_to_string(obj) for name, _ in self.keys
+        ]
+
+    def load_key(self, values):
+        return [
+            self._field(name).to_python(value)
+            for (name, _), value in zip(self.keys, values)
+        ]
+
+    def encode_cursor(self, obj, direction):
+        return signing.dumps([direction, self.dump_key(obj)],
+                             salt=self.cursor_salt)
+
+    def decode_cursor(self, cursor):
+        direction, values = signing.loads(cursor, salt=self.cursor_salt)
+        if direction not in (FORWARD, BACKWARD):
+            raise ValueError('Unknown cursor direction')
+        if len(values) != len(self.keys):
+            raise ValueError('Cursor does not match ordering')
+        return direction, self.load_key(values)
+
+    def clean_cursor(self, cursor):
+        """Return ``cursor`` if it is valid for this ordering, else None."""
+        if not cursor:
+            return None
+        try:
+            self.decode_cursor(cursor)
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+        return cursor
+
+    def get_page(self, cursor):
+        """Return a page for ``cursor``; broken or forged cursors fall back
+        to the first page just like ``Paginator.get_page`` does."""
+        return self.page(self.clean_cursor(cursor))
+
+    def page(self, cursor):
+        rows, has_previous, has_next = self.fetch(cursor)
+        return self.make_page(rows, cursor, has_previous, has_next)
+
+    def fetch(self, cursor):
+        """Load at most ``per_page`` rows after (or before) ``cursor``.
+
+        Returns ``(rows, has_previous, has_next)``.
+        """
+        if not cursor:
+            direction, values = FORWARD, None
+        else:
+            direction, values = self.decode_cursor(cursor)
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, direction))
+        if direction == BACKWARD:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == BACKWARD:
+            rows.reverse()
+            return rows, has_more, True
+        return rows, values is not None, has_more
+
+    def make_page(self, rows, cursor, has_previous, has_next):
+        number = 2 if has_previous else 1
+        self._num_pages = number + 1 if has_next else number
+
+        page = Page(rows, number, self)
+        page.cursor = cursor or ''
+        page.next_cursor = (
+            self.encode_cursor(rows[-1], FORWARD) if has_next and rows
+            else None
+        )
+        page.previous_cursor = (
+            self.encode_cursor(rows[0], BACKWARD) if has_previous and rows
+            else None
+        )
+        return page
+
+    def _field(self, name):
+        return self.object_list.model._meta.get_field(name)
+
+    def _seek(self, values, direction):
+        """Build the row-value comparison ``(k1, k2, ...) > (v1, v2, ...)``
+        as a chain of ORs, honouring the direction of every key."""
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self.keys, values):
+            after = descending != (direction == BACKWARD)
+            lookup = 'lt' if after else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
 
 
 def paginator_add(post_list, post_per_page, request=None):
-    paginator = Paginator(post_list, post_per_page)
-    page_number = 1 if request is None else request.GET.get('page')
-    return paginator.get_page(page_number)
+    """Paginate posts by cursor; old ``?page=N`` links keep working
+    through the classic OFFSET paginator."""
+    params = {} if request is None else request.GET
+    if 'page' in params and 'cursor' not in params:
+        paginator = Paginator(post_list.order_by(*POST_ORDERING),
+                              post_per_page)
+        return paginator.get_page(params.get('page'))
+    paginator = CursorPaginator(post_list, post_per_page)
+    return paginator.get_page(params.get('cursor'))
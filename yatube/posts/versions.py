@@ -0,0 +1,96 @@
+"""Generation counters for cache invalidation.
+
+Every cached fragment embeds the current generation of the content it was
+built from (global feed, group, author or post). Signals bump a generation
+on change, so old fragments are simply never read again and the fragments
+themselves can live for hours. The time of the last bump is kept next to
+the site generation and serves as ``Last-Modified`` of cached pages.
+"""
+import time
+
+from django.core.cache import cache
+
+from core.routers import reading_replica
+
+FRAGMENT_TIMEOUT = 60 * 60 * 6
+GLOBAL = 'all'
+# Меняется вместе с любым другим поколением, ключ кэша целых страниц
+SITE = 'site'
+KEY_PREFIX = 'version'
+# Под тем же префиксом, чтобы тоже миновать локальный LRU
+MODIFIED_KEY = f'{KEY_PREFIX}:{SITE}:modified'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def _key(scope):
+    return f'{KEY_PREFIX}:{scope}'
+
+
+def _initial():
+    # Начинаем с отметки времени, чтобы после вытеснения ключа из кэша
+    # поколение не вернулось к значению, под которым ещё лежат фрагменты
+    return time.time_ns() // 1000
+
+
+def bump(*scopes):
+    # Время пишется до новых поколений: страница, собранная под новым
+    # поколением, не получит старое время
+    cache.set(MODIFIED_KEY, int(time.time()), None)
+    for scope in dict.fromkeys((*scopes, SITE)):
+        key = _key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial(), None)
+
+
+def get_versions(*scopes):
+    keys = [_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def site_modified():
+    """Unix time of the last bump; until one happens, the first call."""
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        cache.add(MODIFIED_KEY, int(time.time()), None)
+        modified = cache.get(MODIFIED_KEY)
+    return modified
+
+
+def cache_context(*scopes):
+    """Context for ``{% cache cache_timeout name cache_version %}``."""
+    pairs = zip(scopes, get_versions(*scopes))
+    return {
+        # Реплика могла ещё не получить изменения, ради которых поколение
+        # уже поднято: готовые фрагменты читаем, но не сохраняем
+        'cache_timeout': 0 if reading_replica() else FRAGMENT_TIMEOUT,
+        'cache_version': ','.join(f'{scope}={ver}' for scope, ver in pairs),
+    }
+
+
+def bump_post(post, *group_ids):
+    """Invalidate every page that shows ``post``."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    bump(
+        GLOBAL,
+        author_scope(post.author_id),
+        post_scope(post.id),
+        *(group_scope(group_id) for group_id in group_ids),
+    )
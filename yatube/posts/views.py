@@ -1,28 +1,43 @@
 from datetime import datetime
+from urllib.parse import urlencode
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, render, redirect
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import require_POST
 
+from . import follows, thumbnails, versions
+from .counters import post_stats, user_stats
 from .forms import CommentForm, PostForm
-from .models import Group, Post, Follow
-from .utills import paginator_add
+from .models import Comment, Group, Post, Follow
+from .search import search_page
+from .timeline import timeline_page
+from .utills import CursorPaginator, paginator_add
+from .versions import cache_context
 
 User = get_user_model()
 
 POSTS_PER_PAGE = 10
 HEADER_LENGTH = 30
+BULK_FOLLOW_LIMIT = 1000
+COMMENTS_PER_PAGE = 50
+# Старые комментарии первыми; (post, created) покрыт индексом вместе с id
+COMMENT_ORDERING = ('created', 'id')
 
 
 def index(request):
     template = 'posts/index.html'
     title = 'Последние обновления на сайте'
-    post_list = Post.objects.select_related('author').all()
+    post_list = Post.objects.select_related('author', 'group')
     page_obj = paginator_add(post_list, POSTS_PER_PAGE, request)
     context = {
         'title': title,
         'page_obj': page_obj,
-        'index': True
+        'index': True,
+        **cache_context(versions.GLOBAL),
     }
     return render(request, template, context)
 
@@ -32,12 +47,13 @@ def group_posts(request, slug):
 
     group = get_object_or_404(Group, slug=slug)
     title = f'{group.title}'
-    post_list = group.posts.all()
+    post_list = group.posts.select_related('author', 'group')
     page_obj = paginator_add(post_list, POSTS_PER_PAGE, request)
     context = {
         'title': title,
         'group': group,
         'page_obj': page_obj,
+        **cache_context(versions.group_scope(group.id)),
     }
 
     return render(request, template, context)
@@ -46,26 +62,39 @@ def group_posts(request, slug):
 def profile(request, username):
     # Здесь код запроса к модели и создание словаря контекста
     author = get_object_or_404(User, username=username)
-    posts = Post.objects.select_related('author').filter(author_id=author.id)
-    post_count = posts.count()
+    posts = Post.objects.select_related('author', 'group').filter(
+        author_id=author.id)
+    stats = user_stats(author.id)
     page_obj = paginator_add(posts, POSTS_PER_PAGE, request)
     title = f'{author}'
-    following = Follow.objects.filter(
-        user_id=request.user.id,
-        author_id=author.id
-    ).exists()
+    following = author.id in follows.followed_ids(request.user.id)
     context = {
         'author': author,
-        'post_count': post_count,
+        'post_count': stats.posts_count,
+        'followers_count': stats.followers_count,
         'page_obj': page_obj,
         'title': title,
         'following': following,
+        **cache_context(versions.author_scope(author.id)),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = search_page(query, POSTS_PER_PAGE, request)
+    context = {
+        'title': f'Поиск: {query}' if query else 'Поиск',
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id)
     context = context_for_detail(post)
     return render(request, 'posts/post_detail.html', context)
 
@@ -81,6 +110,7 @@ def post_create(request):
         post.author = request.user
         post.pub_date = datetime.now()
         post.save()
+        thumbnails.enqueue(post.image, post.id)
 
         return redirect('posts:profile', request.user)
     else:
@@ -96,7 +126,8 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
@@ -107,6 +138,8 @@ def post_edit(request, post_id):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            if 'image' in form.changed_data:
+                thumbnails.enqueue(post.image, post.id)
             return redirect('posts:post_detail', post_id=post.pk)
     elif request.user == post.author:
         title = 'Отредактировать запись'
@@ -123,20 +156,57 @@ def post_edit(request, post_id):
 
 def context_for_detail(post):
     title = post.text[:HEADER_LENGTH]
-    ps = Post.objects.select_related('author').filter(
-        author_id=post.author_id)
-    post_count = ps.count()
-    comments = post.comments.all()
+    post_count = user_stats(post.author_id).posts_count
+    comments_count = post_stats(post.id).comments_count
+    # Запрос к комментариям выполнится, только если фрагмент не в кэше
+    comments = SimpleLazyObject(lambda: comments_window(post.id))
     form = CommentForm()
     return {
         'title': title,
         'post': post,
         'post_count': post_count,
+        'comments_count': comments_count,
         'comments': comments,
-        'form': form
+        'form': form,
+        **cache_context(versions.post_scope(post.id)),
     }
 
 
+def comments_window(post_id, cursor=None):
+    """``COMMENTS_PER_PAGE`` comments of a post after ``cursor``."""
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        COMMENTS_PER_PAGE, COMMENT_ORDERING)
+    return paginator.get_page(cursor)
+
+
+def comments_url(post_id, cursor, **params):
+    query = urlencode({'cursor': cursor, **params})
+    return f'{reverse("posts:post_comments", args=[post_id])}?{query}'
+
+
+def post_comments(request, post_id):
+    # Следующие окна комментариев: HTML-фрагмент или JSON с format=json
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    comments = comments_window(post.id, request.GET.get('cursor'))
+    if request.GET.get('format') != 'json':
+        return render(request, 'posts/includes/comments.html',
+                      {'post': post, 'comments': comments})
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.id,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+        'next': comments.next_cursor and comments_url(
+            post.id, comments.next_cursor, format='json'),
+    })
+
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -152,8 +222,7 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     title = 'Мои подписки'
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_add(post_list, POSTS_PER_PAGE, request)
+    page_obj = timeline_page(request.user, POSTS_PER_PAGE, request)
     context = {
         'title': title,
         'page_obj': page_obj,
@@ -190,3 +259,31 @@ def profile_unfollow(request, username):
     if following:
         follow_record.delete()
     return redirect('posts:follow_index')
+
+
+@login_required
+@require_POST
+def follow_bulk(request):
+    # Подписаться и отписаться от многих авторов одним запросом
+    follow = set(request.POST.getlist('follow'))
+    unfollow = set(request.POST.getlist('unfollow')) - follow
+    if len(follow) + len(unfollow) > BULK_FOLLOW_LIMIT:
+        return JsonResponse(
+            {'error': f'Не больше {BULK_FOLLOW_LIMIT} авторов за раз'},
+            status=400)
+    authors = dict(User.objects.filter(
+        username__in=follow | unfollow).values_list('username', 'id'))
+    names = {author_id: username for username, author_id in authors.items()}
+    user_id = request.user.id
+    followed = follows.follow_many(
+        (user_id, authors[username]) for username in follow
+        if username in authors)
+    unfollowed = follows.unfollow_many(
+        (user_id, authors[username]) for username in unfollow
+        if username in authors)
+    return JsonResponse({
+        'followed': sorted(names[author_id] for _, author_id in followed),
+        'unfollowed': sorted(names[author_id]
+                             for _, author_id in unfollowed),
+        'unknown': sorted((follow | unfollow) - set(authors)),
+    })